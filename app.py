@@ -1,3 +1,4 @@
+import metrics
 from controller import click_generate_btn
 from view import (
     display_header,
@@ -8,6 +9,8 @@ from view import (
 )
 
 
+metrics.configure_from_env()
+
 # --- UI 랜더링 ---
 display_header()
 uploaded_template_file, uploaded_reference_file = display_file_uploaders()
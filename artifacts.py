@@ -0,0 +1,255 @@
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import metrics
+from utils import get_env_int
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+ARTIFACT_MEMORY_BYTES = get_env_int("ARTIFACT_MEMORY_MB", 256) * 1024 * 1024
+ARTIFACT_DISK_BYTES = get_env_int("ARTIFACT_DISK_MB", 2048) * 1024 * 1024
+# 이 크기보다 큰 결과는 처음부터 디스크에 저장합니다.
+ARTIFACT_SPILL_BYTES = get_env_int("ARTIFACT_SPILL_KB", 512) * 1024
+ARTIFACT_SESSION_TTL = get_env_int("ARTIFACT_SESSION_TTL", 3600)  # 초
+SWEEP_INTERVAL = 60  # 초
+
+
+class _Artifact:
+    __slots__ = ("kind", "size", "data", "path")
+
+    def __init__(self, kind, size, data=None, path=None):
+        self.kind = kind  # "bytes", "text", "object"
+        self.size = size
+        self.data = data  # 메모리에 있으면 bytes
+        self.path = path  # 디스크로 내보냈으면 파일 경로
+
+
+def _encode(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "bytes", bytes(value)
+    if isinstance(value, str):
+        return "text", value.encode("utf-8")
+    return "object", pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _decode(kind, data):
+    if kind == "text":
+        return data.decode("utf-8")
+    if kind == "object":
+        return pickle.loads(data)
+    return data
+
+
+class ArtifactStore:
+    """세션별 생성 결과(DOCX, 마크다운 등)를 보관하는 저장소입니다.
+
+    작은 결과는 메모리에 두고, 큰 결과나 메모리 한도를 넘는 오래된 결과는 임시
+    디렉터리의 파일로 내보냅니다(LRU). 디스크 한도를 넘으면 가장 오래된 결과부터
+    지우고, `session_ttl`초 동안 접근이 없는 세션의 결과는 모두 지웁니다.
+    """
+
+    def __init__(
+        self,
+        max_memory_bytes=ARTIFACT_MEMORY_BYTES,
+        max_disk_bytes=ARTIFACT_DISK_BYTES,
+        spill_bytes=ARTIFACT_SPILL_BYTES,
+        session_ttl=ARTIFACT_SESSION_TTL,
+        spill_dir=None,
+    ):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.spill_bytes = spill_bytes
+        self.session_ttl = session_ttl
+        self._spill_dir = spill_dir
+        self._owns_spill_dir = spill_dir is None
+        self._entries = OrderedDict()  # (세션 ID, 이름) -> _Artifact, 오래된 순
+        self._last_access = {}  # 세션 ID -> time.monotonic()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+
+    # --- Public API ---
+    def put(self, session_id, name, value):
+        """결과를 저장합니다. bytes, str 외의 값은 pickle로 저장합니다."""
+        kind, data = _encode(value)
+        with self._lock:
+            self._touch_session(session_id)
+            self._remove((session_id, name))
+            artifact = _Artifact(kind, len(data), data=data)
+            self._entries[(session_id, name)] = artifact
+            self._memory_bytes += artifact.size
+            if artifact.size > self.spill_bytes:
+                self._spill(artifact)
+            self._enforce_limits()
+        self._maybe_sweep()
+
+    def get(self, session_id, name):
+        """저장한 결과를 반환합니다. 없거나 만료되었으면 None."""
+        with self._lock:
+            artifact = self._entries.get((session_id, name))
+            if artifact is None:
+                return None
+            self._touch_session(session_id)
+            self._entries.move_to_end((session_id, name))
+            kind, data, path = artifact.kind, artifact.data, artifact.path
+        self._maybe_sweep()
+        if data is None:
+            data = self._read_file(path)
+            if data is None:
+                return None
+        return _decode(kind, data)
+
+    def reader(self, session_id, name):
+        """호출하면 저장한 결과를 반환하는 함수를 만듭니다 (지연 다운로드용)."""
+
+        def read():
+            value = self.get(session_id, name)
+            return value if value is not None else b""
+
+        return read
+
+    def contains(self, session_id, name):
+        with self._lock:
+            return (session_id, name) in self._entries
+
+    def drop_session(self, session_id):
+        """세션의 결과를 모두 지웁니다."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == session_id]:
+                self._remove(key)
+            self._last_access.pop(session_id, None)
+            self._update_gauges()
+
+    def sweep(self, now=None):
+        """오래 접근하지 않은 세션의 결과를 지우고 지운 세션 수를 반환합니다."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._last_sweep = now
+            expired = [
+                session_id
+                for session_id, last in self._last_access.items()
+                if self.session_ttl and now - last > self.session_ttl
+            ]
+        for session_id in expired:
+            self.drop_session(session_id)
+        if expired:
+            metrics.inc("artifact_expired_sessions_total", len(expired))
+        return len(expired)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "sessions": len(self._last_access),
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+            self._last_access.clear()
+            if self._owns_spill_dir and self._spill_dir:
+                shutil.rmtree(self._spill_dir, ignore_errors=True)
+                self._spill_dir = None
+            self._update_gauges()
+
+    # --- Internals (lock held) ---
+    def _touch_session(self, session_id):
+        self._last_access[session_id] = time.monotonic()
+
+    def _maybe_sweep(self):
+        if time.monotonic() - self._last_sweep >= SWEEP_INTERVAL:
+            self.sweep()
+
+    def _spill(self, artifact):
+        """메모리의 결과를 파일로 내보냅니다. 실패하면 메모리에 그대로 둡니다."""
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="docx-ai-artifacts-")
+        path = os.path.join(self._spill_dir, uuid.uuid4().hex)
+        try:
+            with open(path, "wb") as f:
+                f.write(artifact.data)
+        except OSError as e:
+            logger.warning("결과 파일 저장 오류: %s", e)
+            return
+        artifact.data = None
+        artifact.path = path
+        self._memory_bytes -= artifact.size
+        self._disk_bytes += artifact.size
+        metrics.inc("artifact_spills_total")
+
+    def _remove(self, key):
+        artifact = self._entries.pop(key, None)
+        if artifact is None:
+            return
+        if artifact.path is not None:
+            self._disk_bytes -= artifact.size
+            try:
+                os.remove(artifact.path)
+            except OSError:
+                pass
+        else:
+            self._memory_bytes -= artifact.size
+
+    def _enforce_limits(self):
+        # 메모리 한도: 오래된 결과부터 디스크로 내보냄
+        for artifact in list(self._entries.values()):
+            if self._memory_bytes <= self.max_memory_bytes:
+                break
+            if artifact.data is not None:
+                self._spill(artifact)
+        # 디스크 한도: 오래된 결과부터 지움
+        if self.max_disk_bytes:
+            for key, artifact in list(self._entries.items()):
+                if self._disk_bytes <= self.max_disk_bytes:
+                    break
+                if artifact.path is not None:
+                    self._remove(key)
+                    metrics.inc("artifact_evictions_total")
+        self._update_gauges()
+
+    def _update_gauges(self):
+        metrics.set_gauge("artifact_memory_bytes", self._memory_bytes)
+        metrics.set_gauge("artifact_disk_bytes", self._disk_bytes)
+        metrics.set_gauge("artifact_sessions", len(self._last_access))
+
+    @staticmethod
+    def _read_file(path):
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError as e:
+            logger.warning("결과 파일 읽기 오류: %s", e)
+            return None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store():
+    """프로세스 전체에서 공유하는 결과 저장소를 반환합니다. 처음 호출할 때 만듭니다."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore()
+        return _store
+
+
+def set_artifact_store(store):
+    """사용할 결과 저장소를 교체하고 이전 저장소를 반환합니다."""
+    global _store
+    with _store_lock:
+        previous, _store = _store, store
+        return previous
@@ -0,0 +1,297 @@
+"""여러 계획서/보고서를 한 번에 생성하는 명령줄 도구입니다.
+
+매니페스트(JSONL)의 각 줄이 작업 하나입니다.
+
+    {"template": "서식.pdf", "reference": "참고.pdf", "instructions": "...", "output": "1학년"}
+
+`reference`는 생략할 수 있고, 상대 경로는 매니페스트 파일 위치를 기준으로 합니다.
+
+    python batch.py jobs.jsonl --out-dir out --workers 4
+    LLM_BACKEND=fake python batch.py jobs.jsonl   # API 호출 없이 확인
+
+완료한 작업은 진행 파일(기본: <out-dir>/progress.jsonl)에 기록되며,
+다시 실행하면 이미 끝난 작업은 건너뜁니다.
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import llm
+import metrics
+import model
+from cache import content_hash
+from model import ERROR_MARKER
+from utils import get_env_int
+
+logger = logging.getLogger(__name__)
+
+BATCH_WORKERS = get_env_int("BATCH_WORKERS", 4)
+
+Job = namedtuple("Job", ["line", "template", "reference", "instructions", "output"])
+
+
+# --- Manifest ---
+def load_manifest(path):
+    """매니페스트를 읽어 Job 목록을 반환합니다. 형식이 잘못되면 ValueError."""
+    base_dir = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    outputs = set()
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: JSON 형식 오류 ({e})") from e
+            missing = [
+                key
+                for key in ("template", "instructions", "output")
+                if not record.get(key)
+            ]
+            if missing:
+                raise ValueError(
+                    f"{path}:{line_number}: 필수 항목이 없습니다: {', '.join(missing)}"
+                )
+            if not is_plain_file_name(record["output"]):
+                raise ValueError(
+                    f"{path}:{line_number}: 출력 이름에는 경로를 쓸 수 없습니다: "
+                    f"{record['output']}"
+                )
+            output = output_file_name(record["output"])
+            if output in outputs:
+                raise ValueError(f"{path}:{line_number}: 출력 이름이 중복됩니다: {output}")
+            outputs.add(output)
+            reference = record.get("reference")
+            jobs.append(
+                Job(
+                    line_number,
+                    os.path.join(base_dir, record["template"]),
+                    os.path.join(base_dir, reference) if reference else None,
+                    record["instructions"],
+                    output,
+                )
+            )
+    return jobs
+
+
+def is_plain_file_name(name):
+    """경로 구분자나 ".."가 없는 파일 이름인지 확인합니다 (--out-dir 밖으로 나가지 않게)."""
+    separators = [os.sep] + ([os.altsep] if os.altsep else [])
+    return (
+        isinstance(name, str)
+        and os.path.basename(name) == name
+        and ".." not in name
+        and not any(sep in name for sep in separators)
+    )
+
+
+def output_file_name(name):
+    """출력 이름에 .docx 확장자를 붙입니다."""
+    return name if name.lower().endswith(".docx") else f"{name}.docx"
+
+
+# --- Progress File ---
+class ProgressLog:
+    """완료한 작업을 JSONL로 기록해 중단된 배치를 이어서 실행할 수 있게 합니다."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # 중단되며 잘린 마지막 줄
+                    if record.get("status") == "done":
+                        self.done.add(record["output"])
+
+    def record(self, result):
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+            if result["status"] == "done":
+                self.done.add(result["output"])
+
+
+# --- Extraction ---
+def extract_distinct_pdfs(jobs):
+    """작업들이 쓰는 PDF를 내용 기준으로 한 번씩만 추출합니다.
+
+    {(경로, "template" 또는 "reference"): 프롬프트용 텍스트}, {서식 경로: TemplateOutline},
+    추출한 PDF 수를 반환합니다.
+    """
+    sources = sorted(
+        {(job.template, "template") for job in jobs}
+        | {(job.reference, "reference") for job in jobs if job.reference}
+    )
+    texts = {}
+    outlines = {}
+    by_hash = {}
+    for path, source in sources:
+        try:
+            with open(path, "rb") as f:
+                pdf_bytes = f.read()
+        except OSError as e:
+            logger.warning("PDF 파일을 열 수 없습니다 (%s): %s", path, e)
+            texts[path, source] = None
+            continue
+        key = (content_hash(pdf_bytes), source)
+        if key not in by_hash:
+            pdf_file = io.BytesIO(pdf_bytes)
+            pdf_file.name = os.path.basename(path)
+            if source == "template":
+                by_hash[key] = model.extract_template(pdf_file)
+            else:
+                text = model.extract_prompt_text(
+                    pdf_file, source, model.REFERENCE_TOKEN_BUDGET
+                )
+                by_hash[key] = (model.condense_reference(text), None)
+        texts[path, source], outline = by_hash[key]
+        if source == "template":
+            outlines[path] = outline
+    return texts, outlines, len({pdf_hash for pdf_hash, _ in by_hash})
+
+
+# --- Jobs ---
+def run_job(job, texts, outlines, out_dir):
+    """작업 하나를 생성하고 DOCX로 저장한 뒤 결과 기록(dict)을 반환합니다."""
+    result = {"output": job.output, "line": job.line}
+    start = time.perf_counter()
+    try:
+        template_text = texts.get((job.template, "template"))
+        if not template_text:
+            raise ValueError("PDF 서식 파일에서 텍스트를 추출하지 못했습니다.")
+        reference_text = texts.get((job.reference, "reference"))
+        outline = outlines.get(job.template)
+
+        with metrics.span("batch_job", output=job.output) as span:
+            meter = metrics.StreamMeter(output=job.output)
+            chunks = []
+            for chunk in model.generate_content_from_gemini(
+                template_text, reference_text, job.instructions, outline=outline
+            ):
+                meter.on_chunk(chunk)
+                chunks.append(chunk)
+            meter.finish()
+            markdown_text = "".join(chunks)
+            generated = time.perf_counter()
+            if not markdown_text or ERROR_MARKER in markdown_text:
+                raise RuntimeError(markdown_text.strip() or "빈 응답")
+
+            title, docx_data = model.markdown_to_docx(markdown_text, outline)
+            output_path = os.path.join(out_dir, job.output)
+            tmp_path = f"{output_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(docx_data.getbuffer())
+            os.replace(tmp_path, output_path)
+            span["chars"] = len(markdown_text)
+
+        result.update(
+            status="done",
+            title=title,
+            chars=len(markdown_text),
+            first_chunk_seconds=round(meter.first_chunk_seconds or 0.0, 3),
+            generate_seconds=round(generated - start, 3),
+            convert_seconds=round(time.perf_counter() - generated, 3),
+        )
+    except Exception as e:
+        logger.error("작업 실패 (%s): %s", job.output, e)
+        result.update(status="failed", error=str(e))
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def run_batch(jobs, out_dir, workers=BATCH_WORKERS, progress_path=None, force=False):
+    """작업들을 최대 `workers`개씩 동시에 실행하고 결과 기록 목록을 반환합니다."""
+    os.makedirs(out_dir, exist_ok=True)
+    progress = ProgressLog(progress_path or os.path.join(out_dir, "progress.jsonl"))
+    pending = [
+        job
+        for job in jobs
+        if force
+        or job.output not in progress.done
+        or not os.path.exists(os.path.join(out_dir, job.output))
+    ]
+    results = [
+        {"output": job.output, "line": job.line, "status": "skipped", "seconds": 0.0}
+        for job in jobs
+        if job not in pending
+    ]
+    if not pending:
+        return results
+
+    texts, outlines, distinct = extract_distinct_pdfs(pending)
+    logger.info("PDF %d개 추출 (작업 %d개)", distinct, len(pending))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [
+            executor.submit(run_job, job, texts, outlines, out_dir) for job in pending
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            progress.record(result)
+            results.append(result)
+    results.sort(key=lambda item: item["line"])
+    return results
+
+
+def print_summary(results, wall_seconds):
+    header = (
+        f"{'output':30} {'status':8} {'total s':>8} {'ttfc s':>8} "
+        f"{'gen s':>8} {'docx s':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    for item in results:
+        print(
+            f"{item['output']:30} {item['status']:8} {item['seconds']:>8.2f} "
+            f"{item.get('first_chunk_seconds', 0):>8.2f} "
+            f"{item.get('generate_seconds', 0):>8.2f} "
+            f"{item.get('convert_seconds', 0):>8.2f}"
+        )
+    counts = {}
+    for item in results:
+        counts[item["status"]] = counts.get(item["status"], 0) + 1
+    summary = ", ".join(f"{status} {count}" for status, count in sorted(counts.items()))
+    print(f"\n{summary} / 전체 {wall_seconds:.2f}초")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("manifest", help="작업 목록 JSONL 파일")
+    parser.add_argument("--out-dir", default="output")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument("--progress", metavar="PATH", help="진행 파일 경로")
+    parser.add_argument("--backend", choices=("gemini", "fake", "replay"))
+    parser.add_argument("--force", action="store_true", help="완료한 작업도 다시 실행")
+    args = parser.parse_args(argv)
+
+    metrics.configure_from_env()
+    if args.backend:
+        llm.set_backend(llm.create_backend(args.backend))
+    try:
+        jobs = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"매니페스트 오류: {e}", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    results = run_batch(jobs, args.out_dir, args.workers, args.progress, args.force)
+    print_summary(results, time.perf_counter() - start)
+    return 1 if any(item["status"] == "failed" for item in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""오프라인 마이크로벤치마크: PDF 추출, 마크다운 변환, 스트리밍 루프.
+
+API 키 없이 가짜 LLM 백엔드(llm.FakeBackend)로 실행됩니다.
+
+    python bench.py                          # 전체 실행
+    python bench.py --save-baseline base.json
+    python bench.py --compare base.json      # 기준보다 느려지면 종료 코드 1
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+# 벤치마크는 항상 오프라인으로, 디스크 캐시 없이 실행합니다.
+os.environ.pop("CACHE_DIR", None)
+
+import controller  # noqa: E402
+import llm  # noqa: E402
+import metrics  # noqa: E402
+import model  # noqa: E402
+import view  # noqa: E402
+from compaction import compact_pages  # noqa: E402
+from mdast import extract_title, parse_markdown  # noqa: E402
+
+
+# --- Synthetic Inputs ---
+def make_text_pdf(pages, lines_per_page=40):
+    """텍스트 레이어가 있는 PDF를 직접 만들어 bytes로 반환합니다 (Helvetica, ASCII)."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(pages))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>")
+    font_ref = 3 + 2 * pages
+    for page in range(pages):
+        lines = [f"School plan page {page + 1}"] + [
+            f"Line {n}: weekly schedule item {page}-{n}, budget {n * 1000} won"
+            for n in range(lines_per_page)
+        ]
+        stream = "BT /F1 10 Tf 40 800 Td 12 TL " + " ".join(
+            f"({line}) '" for line in lines
+        ) + " ET"
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 {font_ref} 0 R >> >> "
+            f"/Contents {4 + 2 * page} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n"
+    ).encode()
+    return bytes(out)
+
+
+def make_markdown(table_rows, list_items=30, sections=5):
+    """표와 목록이 많은 가짜 계획서 마크다운을 만듭니다."""
+    parts = ["# 2025학년도 프로젝트 학습 운영 계획서", ""]
+    for section in range(1, sections + 1):
+        parts += [f"## {section}. 추진 내용", "", "**목표**: 학생 중심 *탐구* 활동 강화", ""]
+        parts += [f"- 세부 활동 {i}: ***핵심*** 내용과 일정" for i in range(list_items)]
+        parts += [""] + [f"{i}. 단계별 추진 {i}" for i in range(1, list_items + 1)]
+        parts += ["", "| 주차 | 활동 | 담당 | 예산 | 비고 |", "|---|---|---|---|---|"]
+        parts += [
+            f"| {r + 1}주 | 활동 {r} | 교사 {r % 7} | {r * 1500}원 | - |"
+            for r in range(table_rows)
+        ]
+        parts.append("")
+    return "\n".join(parts)
+
+
+class _NullPlaceholder:
+    def markdown(self, body, unsafe_allow_html=False):
+        pass
+
+
+# --- Benchmarks ---
+def bench_extract(pdf_bytes):
+    def run():
+        model.pdf_text_cache.clear()  # 캐시가 아닌 추출 자체를 측정
+        return model.extract_text_from_pdf(io.BytesIO(pdf_bytes))
+
+    return run
+
+
+def bench_compact(page_texts):
+    return lambda: compact_pages(page_texts)
+
+
+def bench_markdown_to_docx(markdown_text):
+    return lambda: model.markdown_to_docx(markdown_text)
+
+
+def bench_title(markdown_text):
+    return lambda: extract_title(parse_markdown(markdown_text))
+
+
+def bench_stream_loop(fake_backend):
+    def run():
+        llm.set_backend(fake_backend)
+        model.generation_cache.clear()  # 캐시 재생이 아닌 스트림을 측정
+        chunks = model.generate_content_from_gemini("서식", None, "지시사항")
+        return controller.consume_stream(
+            chunks,
+            view.StreamRenderer(_NullPlaceholder()),
+            model.DocxStreamBuilder(),
+            metrics.StreamMeter(),
+        )
+
+    return run
+
+
+def measure(name, fn, repeat, work, unit):
+    """`fn`을 `repeat`번 실행해 최소/평균 시간, 처리량, 최대 메모리를 구합니다."""
+    fn()  # 워밍업 (프로세스 풀, 기본 문서 생성 등)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(timings)
+    return {
+        "name": name,
+        "best_ms": round(best * 1000, 3),
+        "mean_ms": round(sum(timings) / len(timings) * 1000, 3),
+        "throughput": round(work / best, 1) if best else 0.0,
+        "unit": f"{unit}/s",
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def build_benchmarks(args):
+    benchmarks = []
+    for pages in args.pages:
+        pdf_bytes = make_text_pdf(pages)
+        name = f"extract_text_from_pdf[{pages}p]"
+        benchmarks.append((name, bench_extract(pdf_bytes), pages, "pages"))
+        page_texts = model.extract_pages_from_pdf(io.BytesIO(pdf_bytes))
+        name = f"compact_pages[{pages}p]"
+        benchmarks.append((name, bench_compact(page_texts), pages, "pages"))
+    for rows in args.rows:
+        markdown_text = make_markdown(rows)
+        size = len(markdown_text)
+        benchmarks.append(
+            (
+                f"markdown_to_docx[{rows}rows]",
+                bench_markdown_to_docx(markdown_text),
+                size,
+                "chars",
+            )
+        )
+        benchmarks.append(
+            (f"extract_title[{rows}rows]", bench_title(markdown_text), size, "chars")
+        )
+    response_text = make_markdown(args.rows[0])
+    fake_backend = llm.FakeBackend(response_text, args.chunk_chars, args.chunk_delay)
+    chunk_count = -(-len(response_text) // args.chunk_chars)
+    benchmarks.append(
+        (
+            f"stream_loop[{args.chunk_chars}c/{args.chunk_delay * 1000:g}ms]",
+            bench_stream_loop(fake_backend),
+            chunk_count,
+            "chunks",
+        )
+    )
+    return benchmarks
+
+
+def compare(results, baseline, tolerance):
+    """기준 결과와 비교해 `tolerance` 이상 느려진 항목 이름 목록을 반환합니다."""
+    base_by_name = {item["name"]: item for item in baseline["results"]}
+    regressions = []
+    for item in results:
+        base = base_by_name.get(item["name"])
+        if base is None:
+            continue
+        ratio = item["best_ms"] / base["best_ms"] if base["best_ms"] else 1.0
+        item["vs_baseline"] = f"{ratio:.2f}x"
+        if ratio > 1 + tolerance:
+            regressions.append(item["name"])
+    return regressions
+
+
+def print_table(results):
+    header = (
+        f"{'benchmark':40} {'best ms':>10} {'mean ms':>10} "
+        f"{'throughput':>18} {'peak KB':>10}"
+    )
+    print(header)
+    print("-" * len(header))
+    for item in results:
+        throughput = f"{item['throughput']:,.1f} {item['unit']}"
+        line = (
+            f"{item['name']:40} {item['best_ms']:>10.2f} {item['mean_ms']:>10.2f} "
+            f"{throughput:>18} {item['peak_kb']:>10.1f}"
+        )
+        if "vs_baseline" in item:
+            line += f"  ({item['vs_baseline']})"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--rows", type=int, nargs="+", default=[20, 200])
+    parser.add_argument("--chunk-chars", type=int, default=40)
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="초")
+    parser.add_argument("--filter", default="", help="이름에 이 문자열이 있는 항목만")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="허용 감속 비율")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    results = [
+        measure(name, fn, args.repeat, work, unit)
+        for name, fn, work, unit in build_benchmarks(args)
+        if args.filter in name
+    ]
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+    print_table(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({"results": results}, f, ensure_ascii=False, indent=2)
+    if regressions:
+        print(f"\n기준 대비 {args.tolerance:.0%} 이상 느려짐: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
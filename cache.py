@@ -0,0 +1,264 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+from utils import get_cache_dir
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(*parts):
+    """바이트/문자열 조각들을 이어 붙인 SHA-256 해시(16진수)를 반환합니다."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(len(part).to_bytes(8, "big"))  # 조각 경계를 구분
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def cache_dir_for(name):
+    """캐시 이름별 디스크 디렉터리를 반환합니다. 디스크 캐시가 꺼져 있으면 None."""
+    root = get_cache_dir()
+    if not root:
+        return None
+    return os.path.join(root, name)
+
+
+def _approx_size(value):
+    """메모리 한도 계산용으로 값의 대략적인 크기(바이트)를 구합니다."""
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(_approx_size(item) for item in value) + 8 * len(value)
+    if isinstance(value, dict):
+        return sum(_approx_size(k) + _approx_size(v) for k, v in value.items())
+    return 64
+
+
+class ContentCache:
+    """내용 해시를 키로 사용하는 캐시입니다.
+
+    메모리 LRU 계층을 먼저 확인하고, `disk_dir`이 주어지면 JSON 파일로 저장되는
+    디스크 계층을 사용합니다. 디스크 계층은 `max_disk_bytes`를 넘으면 가장 오래
+    사용하지 않은 파일부터 삭제합니다. 값은 JSON으로 직렬화 가능해야 합니다.
+    메모리 계층은 `max_entries`개와 `max_memory_bytes`(대략적인 크기)를 넘지 않으며,
+    `ttl`이 주어지면 저장 후 그 시간이 지난 항목은 없는 것으로 취급합니다.
+
+    히트/미스/축출 횟수는 캐시 이름을 `cache` 레이블로 붙여 지표로도 내보냅니다
+    (cache_hits_total, cache_misses_total, cache_evictions_total). 메모리 계층의 항목
+    수와 크기, 디스크 계층 크기는 cache_entries, cache_memory_bytes, cache_disk_bytes
+    게이지로 내보냅니다.
+    """
+
+    def __init__(
+        self,
+        name,
+        max_entries=128,
+        disk_dir=None,
+        max_disk_bytes=0,
+        max_memory_bytes=0,
+        ttl=0,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl  # 초 단위 유효 기간 (0이면 만료 없음)
+        self._memory = OrderedDict()  # key -> (value, size, created)
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._disk_bytes = None  # 처음 디스크를 사용할 때 계산
+        self._counters = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "disk_evictions": 0,
+        }
+        self._register_metrics()
+
+    # --- Public API ---
+    def get(self, key, default=None):
+        """키에 해당하는 값을 반환합니다. 없으면 `default`를 반환합니다."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and self._expired(entry[2]):
+                self._memory_pop(key)
+                entry = None
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._counters["hits"] += 1
+                self._counters["memory_hits"] += 1
+                metrics.inc("cache_hits_total", cache=self.name, tier="memory")
+                return entry[0]
+
+        value, created = self._disk_get(key)
+        with self._lock:
+            if value is None:
+                self._counters["misses"] += 1
+                metrics.inc("cache_misses_total", cache=self.name)
+                return default
+            self._counters["hits"] += 1
+            self._counters["disk_hits"] += 1
+            metrics.inc("cache_hits_total", cache=self.name, tier="disk")
+            self._memory_put(key, value, created)
+        return value
+
+    def put(self, key, value):
+        """값을 메모리 계층(및 디스크 계층)에 저장합니다."""
+        created = time.time()
+        with self._lock:
+            self._memory_put(key, value, created)
+        self._disk_put(key, value, created)
+
+    def stats(self):
+        """히트/미스/축출 카운터와 현재 크기를 딕셔너리로 반환합니다."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_bytes
+            stats["disk_bytes"] = self._disk_bytes or 0
+        return stats
+
+    def clear(self):
+        """메모리 계층을 비웁니다. 디스크 계층은 유지합니다."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._update_gauges()
+
+    def _register_metrics(self):
+        # 아직 요청이 없어도 캐시별 지표가 0으로 보이도록 미리 등록합니다.
+        for tier in ("memory", "disk"):
+            metrics.inc("cache_hits_total", 0, cache=self.name, tier=tier)
+            metrics.inc("cache_evictions_total", 0, cache=self.name, tier=tier)
+        metrics.inc("cache_misses_total", 0, cache=self.name)
+        self._update_gauges()
+
+    def _update_gauges(self):
+        metrics.set_gauge("cache_entries", len(self._memory), cache=self.name)
+        metrics.set_gauge("cache_memory_bytes", self._memory_bytes, cache=self.name)
+        metrics.set_gauge("cache_disk_bytes", self._disk_bytes or 0, cache=self.name)
+
+    def _expired(self, created):
+        return bool(self.ttl) and time.time() - created > self.ttl
+
+    # --- Memory Tier ---
+    def _memory_put(self, key, value, created):
+        if key in self._memory:
+            self._memory_pop(key)
+        size = _approx_size(value)
+        self._memory[key] = (value, size, created)
+        self._memory_bytes += size
+        while self._memory and (
+            len(self._memory) > self.max_entries
+            or (self.max_memory_bytes and self._memory_bytes > self.max_memory_bytes)
+        ):
+            _, (_, evicted_size, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+            self._counters["evictions"] += 1
+            metrics.inc("cache_evictions_total", cache=self.name, tier="memory")
+        self._update_gauges()
+
+    def _memory_pop(self, key):
+        _, size, _ = self._memory.pop(key)
+        self._memory_bytes -= size
+
+    # --- Disk Tier ---
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _disk_get(self, key):
+        if not self.disk_dir:
+            return None, None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+            value, created = record["value"], record["created"]
+        except (OSError, ValueError, TypeError, KeyError):
+            return None, None
+        if self._expired(created):
+            return None, None
+        try:
+            os.utime(path)  # LRU 순서를 위해 접근 시각 갱신
+        except OSError:
+            pass
+        return value, created
+
+    def _disk_put(self, key, value, created):
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            previous_size = os.path.getsize(path)
+        except OSError:
+            previous_size = 0
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                record = {"created": created, "value": value}
+                json.dump(record, f, ensure_ascii=False)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("캐시 저장 오류 (%s): %s", self.name, e)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk_bytes()
+            else:
+                # 같은 키를 덮어쓰면 이전 파일 크기를 빼야 합계가 늘어나지 않습니다.
+                self._disk_bytes += size - previous_size
+            if self.max_disk_bytes and self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+            self._update_gauges()
+
+    def _disk_entries(self):
+        entries = []
+        for root, _, files in os.walk(self.disk_dir):
+            for file_name in files:
+                if not file_name.endswith(".json"):
+                    continue
+                path = os.path.join(root, file_name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _scan_disk_bytes(self):
+        return sum(size for _, size, _ in self._disk_entries())
+
+    def _evict_disk(self):
+        entries = sorted(self._disk_entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self._counters["disk_evictions"] += 1
+            metrics.inc("cache_evictions_total", cache=self.name, tier="disk")
+        self._disk_bytes = total
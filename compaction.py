@@ -0,0 +1,179 @@
+import re
+from collections import Counter, namedtuple
+
+from scheduler import CHARS_PER_TOKEN
+
+# --- Configuration ---
+# 전체 쪽수의 이 비율 이상에 나오는 줄은 머리글/바닥글로 봅니다.
+REPEATED_LINE_RATIO = 0.5
+REPEATED_LINE_MIN_PAGES = 3
+# 쪽마다 처음/끝 이 줄 수만큼은 숫자만 다른 줄도 같은 머리글/바닥글로 봅니다.
+EDGE_LINES = 1
+# 반복 줄은 쪽마다 처음/끝 이 줄 수(머리글/바닥글 자리) 안에서만 찾습니다.
+REPEATED_LINE_BAND = 2
+# 이보다 짧은 줄은 반복되어도 지우지 않습니다 (표 항목명 '구분', '합계' 등).
+REPEATED_LINE_MIN_CHARS = 5
+TRUNCATION_MARK = "…(이하 생략)"
+
+SPACE_RUN_RE = re.compile(r"[ \t　\xa0]+")
+DIGITS_RE = re.compile(r"\d+")
+PAGE_NUMBER_RE = re.compile(
+    r"^(?:[-–—\s]*\d+\s*(?:/\s*\d+)?[-–—\s]*"
+    r"|(?:page|p\.)\s*\d+(?:\s*(?:of|/)\s*\d+)?"
+    r"|\d+\s*쪽(?:\s*/\s*\d+\s*쪽)?)$",
+    re.IGNORECASE,
+)
+# 번호가 붙은 제목 줄 (1. / 가. / Ⅰ. / □ / ■ / 제1장 등)
+SECTION_HEADING_RE = re.compile(
+    r"^(?:\d+(?:\.\d+)*[.)]\s|[가-하][.)]\s|[ⅠⅡⅢⅣⅤⅥⅦⅧⅨⅩ]+\.?\s"
+    r"|[□■◆◇▶]\s?|제\s?\d+\s?[장절조])"
+)
+
+CompactionResult = namedtuple(
+    "CompactionResult",
+    ["text", "original_chars", "compacted_chars", "removed_lines", "truncated"],
+)
+
+
+def _normalize_line(line):
+    return SPACE_RUN_RE.sub(" ", line).strip()
+
+
+def _normalize_page(page):
+    """공백을 정리한 줄 목록과 지운 쪽 번호 줄 수를 반환합니다.
+
+    쪽 처음/끝의 쪽 번호 줄은 빈 줄로 바꿉니다.
+    """
+    lines = [_normalize_line(line) for line in page.splitlines()]
+    text_lines = [i for i, line in enumerate(lines) if line]
+    removed = 0
+    # 본문의 숫자만 있는 줄(표 셀 등)은 지우지 않도록 가장자리 줄만 확인합니다.
+    for i in set(text_lines[:EDGE_LINES] + text_lines[-EDGE_LINES:]):
+        if PAGE_NUMBER_RE.match(lines[i]):
+            lines[i] = ""
+            removed += 1
+    return lines, removed
+
+
+def _page_signatures(lines):
+    """한 쪽의 줄마다 반복 판정에 쓸 서명을 만듭니다.
+
+    머리글/바닥글 자리(쪽의 처음/끝 줄)에 있는 충분히 긴 줄만 서명을 받고,
+    나머지 줄은 None입니다. 가장 바깥 줄은 쪽 번호, 날짜처럼 숫자만 바뀌어도
+    같은 줄로 봅니다.
+    """
+    text_lines = [i for i, line in enumerate(lines) if line]
+    edges = set(text_lines[:EDGE_LINES] + text_lines[-EDGE_LINES:])
+    band = text_lines[:REPEATED_LINE_BAND] + text_lines[-REPEATED_LINE_BAND:]
+    signatures = [None] * len(lines)
+    for i in band:
+        if len(lines[i]) >= REPEATED_LINE_MIN_CHARS:
+            signatures[i] = DIGITS_RE.sub("#", lines[i]) if i in edges else lines[i]
+    return signatures
+
+
+def find_repeated_lines(signed_pages, ratio=REPEATED_LINE_RATIO):
+    """여러 쪽에 반복해서 나오는 줄의 서명 집합을 반환합니다."""
+    if len(signed_pages) < REPEATED_LINE_MIN_PAGES:
+        return set()
+    counts = Counter()
+    for signatures in signed_pages:
+        counts.update(set(signatures) - {None})
+    threshold = max(REPEATED_LINE_MIN_PAGES, ratio * len(signed_pages))
+    return {signature for signature, count in counts.items() if count >= threshold}
+
+
+def compact_pages(pages, token_budget=0):
+    """페이지별 텍스트를 프롬프트용으로 압축합니다.
+
+    - 연속된 공백과 빈 줄을 하나로 줄입니다.
+    - 쪽 번호만 있는 줄을 지웁니다.
+    - 여러 쪽의 머리글/바닥글 자리에 반복되는 줄은 처음 한 번만 남깁니다.
+      본문 줄은 반복되어도 그대로 둡니다.
+    - `token_budget`이 있으면 절(section)별로 고르게 잘라 예산 안에 맞춥니다.
+    """
+    original_chars = sum(len(page) for page in pages)
+    normalized = []
+    removed = 0
+    for page in pages:
+        page_lines, page_numbers = _normalize_page(page)
+        normalized.append(page_lines)
+        removed += page_numbers
+    signed_pages = [_page_signatures(lines) for lines in normalized]
+    repeated = find_repeated_lines(signed_pages)
+
+    seen_repeated = set()
+    lines = []
+    for page_lines, signatures in zip(normalized, signed_pages):
+        for line, signature in zip(page_lines, signatures):
+            if not line:
+                if lines and lines[-1]:
+                    lines.append("")
+                continue
+            if signature in repeated:
+                if signature in seen_repeated:
+                    removed += 1
+                    continue
+                seen_repeated.add(signature)
+            lines.append(line)
+        if lines and lines[-1]:
+            lines.append("")  # 쪽 경계
+
+    truncated = False
+    if token_budget:
+        lines, truncated = truncate_by_section(lines, token_budget * CHARS_PER_TOKEN)
+    text = "\n".join(lines).strip()
+    return CompactionResult(text, original_chars, len(text), removed, truncated)
+
+
+def split_sections(lines):
+    """제목 줄을 기준으로 줄 목록을 절 단위로 나눕니다."""
+    sections = [[]]
+    for line in lines:
+        if SECTION_HEADING_RE.match(line) and sections[-1]:
+            sections.append([])
+        sections[-1].append(line)
+    return sections
+
+
+def truncate_by_section(lines, char_budget):
+    """각 절에 예산을 고르게 나누어 긴 절의 뒷부분을 자릅니다.
+
+    예산보다 짧은 절은 그대로 두고, 남는 예산은 긴 절들에 다시 나눕니다.
+    모든 절의 제목 줄은 남겨 문서 구조가 유지되게 하므로, 절이 아주 많으면
+    예산을 조금 넘을 수 있습니다.
+    """
+    sections = split_sections(lines)
+    sizes = [sum(len(line) + 1 for line in section) for section in sections]
+    if sum(sizes) <= char_budget:
+        return lines, False
+
+    # 물 채우기(water-filling) 방식으로 절별 한도를 정합니다.
+    limits = [0] * len(sections)
+    remaining = sorted(range(len(sections)), key=lambda i: sizes[i])
+    budget = char_budget
+    while remaining:
+        share = budget // len(remaining)
+        index = remaining[0]
+        if sizes[index] <= share:
+            limits[index] = sizes[index]
+            budget -= sizes[index]
+            remaining.pop(0)
+        else:
+            for index in remaining:
+                limits[index] = share
+            break
+
+    result = []
+    for section, size, limit in zip(sections, sizes, limits):
+        if size <= limit:
+            result.extend(section)
+            continue
+        used = 0
+        for position, line in enumerate(section):
+            if position and used + len(line) + 1 > limit:
+                result.append(TRUNCATION_MARK)
+                break
+            result.append(line)
+            used += len(line) + 1
+    return result, True
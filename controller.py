@@ -1,7 +1,32 @@
-import markdown
-import time  # For small delay in streaming view
+import uuid
+
+import metrics
 import view
 import model
+from artifacts import get_artifact_store
+from model import ERROR_MARKER
+from sections import join_sections, sections_html
+
+# 세션 상태에는 작은 값만 두고, 결과 본문(마크다운, DOCX, 부분 목록)은 결과 저장소에 둡니다.
+RESULT_KEYS = (
+    "result_title",
+    "template_outline",
+    "last_instructions",
+)
+RESULT_MD = "result_md"
+RESULT_DOCX = "result_docx"
+RESULT_SECTIONS = "result_sections"
+
+
+def consume_stream(chunks, renderer, docx_builder, meter):
+    """생성 스트림을 읽으며 결과 영역과 DOCX 변환을 갱신하고 전체 텍스트를 반환합니다."""
+    for chunk in chunks:
+        meter.on_chunk(chunk)
+        renderer.append(chunk)
+        docx_builder.feed(chunk)
+    renderer.flush()
+    meter.finish()
+    return renderer.text
 
 
 def click_generate_btn(props):
@@ -13,8 +38,9 @@ def click_generate_btn(props):
     ) = props
     if generate_button_clicked:
         # 새 결과 생성 시 이전 세션 값 초기화
-        view.st.session_state.pop("last_result_md", None)
-        view.st.session_state.pop("last_docx_data", None)
+        for key in RESULT_KEYS:
+            view.st.session_state.pop(key, None)
+        get_artifact_store().drop_session(view.get_session_id())
 
         # 1. 입력 유효성 검사
         if not uploaded_template_file:
@@ -22,11 +48,26 @@ def click_generate_btn(props):
         elif not user_instructions:
             view.display_warning("작성 지시사항을 입력하세요.")
         else:
+            request_id = uuid.uuid4().hex[:8]
+            metrics.inc("requests_total")
+
             # 2. PDF 텍스트 추출
-            template_text = model.extract_text_from_pdf(uploaded_template_file)
-            reference_text = model.extract_text_from_pdf(
-                uploaded_reference_file
-            )  # Returns None if no file
+            with metrics.span("extraction", request_id=request_id):
+                template_text, template_outline = model.extract_template(
+                    uploaded_template_file
+                )
+                reference_text = model.extract_prompt_text(
+                    uploaded_reference_file,
+                    source="reference",
+                    token_budget=model.REFERENCE_TOKEN_BUDGET,
+                )  # Returns None if no file
+
+            # 긴 참고 파일은 조각별로 요약해 프롬프트에 넣음
+            if model.needs_reference_summary(reference_text):
+                with view.display_spinner("참고 파일 요약 중..."):
+                    reference_text = model.condense_reference(
+                        reference_text, session_id=view.get_session_id()
+                    )
 
             if not template_text:
                 view.display_warning(
@@ -39,22 +80,29 @@ def click_generate_btn(props):
                 # 4. 콘텐츠 생성 (스트리밍) 및 표시
                 full_response_md = ""
                 error_occurred = False
+                renderer = view.StreamRenderer(results_placeholder)
+                # 스트림을 받는 동안 DOCX 변환을 함께 진행
+                docx_builder = model.DocxStreamBuilder(template_outline)
+                meter = metrics.StreamMeter(request_id=request_id)
                 try:
                     with view.display_spinner("보고서/계획서 생성 중..."):
-                        for chunk in model.generate_content_from_gemini(
-                            template_text, reference_text, user_instructions
-                        ):
-                            full_response_md += chunk
-                            view.update_results_stream(
-                                results_placeholder, full_response_md
-                            )
-                            time.sleep(0.01)
-
-                        if "오류 발생:" in full_response_md:
-                            error_occurred = True
+                        full_response_md = consume_stream(
+                            model.generate_content_from_gemini(
+                                template_text,
+                                reference_text,
+                                user_instructions,
+                                session_id=view.get_session_id(),
+                                outline=template_outline,
+                            ),
+                            renderer,
+                            docx_builder,
+                            meter,
+                        )
+                        metrics.observe("ui_render_seconds", renderer.render_time)
+                        metrics.inc("ui_renders_total", renderer.render_count)
 
-                    # ✅ 결과 저장
-                    view.st.session_state["last_result_md"] = full_response_md
+                        if ERROR_MARKER in full_response_md:
+                            error_occurred = True
 
                 except Exception as e:
                     error_occurred = True
@@ -63,34 +111,124 @@ def click_generate_btn(props):
 
                 # 5. 최종 결과 처리 및 DOCX 생성/다운로드 버튼 표시
                 if not error_occurred and full_response_md:
-                    final_html = markdown.markdown(
-                        full_response_md, extensions=["tables", "fenced_code"]
-                    )
-                    view.display_final_result(results_placeholder, final_html)
+                    # 스트리밍 중 파싱된 블록을 HTML 미리보기와 DOCX가 함께 사용
+                    with metrics.span("docx_build", request_id=request_id) as span:
+                        title, docx_data = docx_builder.finish()
+                        span["blocks"] = len(docx_builder.blocks)
+                    # 스트리밍 중 점진 변환에 쓴 시간까지 포함한 전체 변환 시간
+                    metrics.observe("docx_build_total_seconds", docx_builder.build_time)
+                    # 부분 다시 쓰기를 위해 제목 기준으로 나누어 보관
+                    with metrics.span("section_split", request_id=request_id) as span:
+                        sections = model.sections_from_builder(
+                            full_response_md, docx_builder
+                        )
+                        span["sections"] = len(sections)
+                    with metrics.span("html_render", request_id=request_id):
+                        final_html = sections_html(sections)
+                    with metrics.span("ui_final_render", request_id=request_id):
+                        view.display_final_result(results_placeholder, final_html)
 
-                    title, docx_data = model.markdown_to_docx(full_response_md)
                     if docx_data:
                         # 결과는 유지하면서 다운로드 버튼 표시
-                        view.st.session_state["last_docx_data"] = docx_data
-                        view.display_download_button(title, docx_data)
+                        state = view.st.session_state
+                        save_result(sections, title, docx_data, full_response_md)
+                        state["template_outline"] = template_outline
+                        state["last_instructions"] = user_instructions
+                        view.display_download_button(title, docx_reader())
+                        view.display_section_editor([s.heading for s in sections])
                     else:
                         view.display_warning("결과를 DOCX로 변환하는 데 실패했습니다.")
+    else:
+        # 다른 위젯 조작으로 다시 실행될 때 이전 결과 복원
+        show_stored_result()
+
+
+def save_result(sections, title, docx_data, markdown):
+    """결과를 결과 저장소에 보관합니다. 큰 결과는 저장소가 디스크로 내보냅니다."""
+    session_id = view.get_session_id()
+    store = get_artifact_store()
+    # BytesIO 내부 버퍼를 한 번만 복사해 저장하고 BytesIO는 버립니다.
+    store.put(session_id, RESULT_DOCX, docx_data.getbuffer())
+    store.put(session_id, RESULT_MD, markdown)
+    store.put(session_id, RESULT_SECTIONS, sections)
+    view.st.session_state["result_title"] = title
+
+
+def docx_reader():
+    """다운로드 버튼에 넘길, 저장한 DOCX를 읽는 함수를 만듭니다."""
+    return get_artifact_store().reader(view.get_session_id(), RESULT_DOCX)
+
+
+def show_stored_result():
+    """세션에 보관한 결과를 다시 표시하고, 요청이 있으면 한 부분을 다시 작성합니다."""
+    state = view.st.session_state
+    if "result_title" not in state:
+        return
+    sections = get_artifact_store().get(view.get_session_id(), RESULT_SECTIONS)
+    if not sections:
+        # 오래 사용하지 않아 저장소에서 지워진 결과
+        for key in RESULT_KEYS:
+            state.pop(key, None)
+        view.display_warning("보관 기간이 지나 이전 결과가 삭제되었습니다. 다시 생성해주세요.")
+        return
+
+    _, results_placeholder = view.display_results_area()
+    view.display_final_result(results_placeholder, sections_html(sections))
+    download_placeholder = view.display_download_area()
+    index, section_instructions, clicked = view.display_section_editor(
+        [section.heading for section in sections]
+    )
+    if clicked:
+        sections = regenerate_section(sections, index, section_instructions)
+        # 다시 작성한 부분만 새로 렌더링되고 나머지는 보관한 결과를 이어 붙임
+        with metrics.span("html_render", kind="section"):
+            final_html = sections_html(sections)
+        view.display_final_result(results_placeholder, final_html)
+    view.display_download_button(
+        state["result_title"], docx_reader(), download_placeholder
+    )
+
+
+def regenerate_section(sections, index, section_instructions):
+    """`index`번째 부분만 다시 생성해 세션 결과를 갱신하고 새 부분 목록을 반환합니다."""
+    state = view.st.session_state
+    request_id = uuid.uuid4().hex[:8]
+    _, stream_placeholder = view.display_results_area()
+    renderer = view.StreamRenderer(stream_placeholder)
+    outline = state.get("template_outline")
+    section_builder = model.DocxStreamBuilder(outline)
+    meter = metrics.StreamMeter("section_generation", request_id=request_id)
+    try:
+        with view.display_spinner("선택한 부분 다시 작성 중..."):
+            section_md = consume_stream(
+                model.regenerate_section(
+                    outline,
+                    sections,
+                    index,
+                    state.get("last_instructions", ""),
+                    section_instructions,
+                    session_id=view.get_session_id(),
+                ),
+                renderer,
+                section_builder,
+                meter,
+            )
+    except Exception as e:
+        view.display_error(f"부분 다시 작성 중 오류 발생: {e}")
+        return sections
+    finally:
+        stream_placeholder.empty()
+
+    if not section_md.strip() or ERROR_MARKER in section_md:
+        view.display_error(section_md.strip() or "빈 응답을 받았습니다.")
+        return sections
 
-                # 결과 복원
-                # if (
-                #     "last_result_md" in view.st.session_state
-                #     and not generate_button_clicked
-                # ):
-                #     prev_html = markdown.markdown(
-                #         view.st.session_state["last_result_md"],
-                #         extensions=["tables", "fenced_code"],
-                #     )
-                #     results_container, result_placeholder = view.display_results_area()
-                #     view.display_final_result(result_placeholder, prev_html)
-
-                #     if "last_docx_data" in view.st.session_state:
-                #         view.display_download_button(
-                #             results_container,
-                #             view.st.session_state["last_docx_data"],
-                #             key="download_button_restored",
-                #         )
+    sections = model.replace_section(
+        sections,
+        index,
+        model.section_from_builder(section_md, section_builder),
+        outline,
+    )
+    title, docx_data = model.assemble_docx(sections)
+    save_result(sections, title, docx_data, join_sections(sections))
+    return sections
@@ -0,0 +1,166 @@
+import io
+import threading
+
+# 마크다운 변환에서 사용하는 스타일 (서식 템플릿에도 반드시 있어야 함)
+REQUIRED_STYLES = (
+    "Normal",
+    "Heading 1",
+    "Heading 2",
+    "Heading 3",
+    "Heading 4",
+    "List Bullet",
+    "List Number",
+    "Quote",
+    "Table Grid",
+)
+HEADING_STYLES = ("Title", "Heading 1", "Heading 2", "Heading 3", "Heading 4")
+# 하위 목록 스타일 (서식 템플릿에 없으면 첫 수준 목록 스타일로 대신함)
+NESTED_LIST_STYLES = (
+    "List Bullet 2",
+    "List Bullet 3",
+    "List Number 2",
+    "List Number 3",
+)
+STYLES_WITH_EFFECTS_RELTYPE = (
+    "http://schemas.microsoft.com/office/2007/relationships/stylesWithEffects"
+)
+
+
+def _set_style_font(style, font_name, size=None):
+    from docx.oxml.ns import qn
+
+    font = style.font
+    font.name = font_name
+    # 한글은 eastAsia 글꼴이 적용되므로 함께 지정합니다.
+    r_fonts = style.element.get_or_add_rPr().get_or_add_rFonts()
+    r_fonts.set(qn("w:eastAsia"), font_name)
+    for theme_attr in ("w:asciiTheme", "w:hAnsiTheme", "w:eastAsiaTheme"):
+        r_fonts.attrib.pop(qn(theme_attr), None)
+    if size is not None:
+        font.size = size
+
+
+def _prune_styles(doc, keep_names):
+    """사용하지 않는 스타일 정의를 지워 기본 문서의 파싱/저장 비용을 줄입니다."""
+    from docx.oxml.ns import qn
+
+    styles_element = doc.styles.element
+    by_id = {style.styleId: style for style in styles_element.style_lst}
+    keep_ids = set()
+    # XML의 스타일 이름은 UI 이름과 다를 수 있어(예: "heading 1") python-docx로 찾습니다.
+    pending = [doc.styles[name].style_id for name in keep_names]
+    pending += [style.styleId for style in styles_element.style_lst if style.default]
+    while pending:
+        style_id = pending.pop()
+        if style_id in keep_ids or style_id not in by_id:
+            continue
+        keep_ids.add(style_id)
+        style = by_id[style_id]
+        for child in (style.basedOn, style.next, style.find(qn("w:link"))):
+            if child is not None:
+                pending.append(child.get(qn("w:val")))
+
+    for style in styles_element.style_lst:
+        if style.styleId not in keep_ids:
+            styles_element.remove(style)
+    latent_styles = styles_element.find(qn("w:latentStyles"))
+    if latent_styles is not None:
+        styles_element.remove(latent_styles)
+
+    # Word 2010 호환용 중복 스타일 파트는 필요하지 않습니다.
+    for r_id, rel in list(doc.part.rels.items()):
+        if rel.reltype == STYLES_WITH_EFFECTS_RELTYPE:
+            doc.part.drop_rel(r_id)
+
+
+def _clear_body(doc):
+    """서식 템플릿의 본문 내용을 지우고 구역 설정(sectPr)만 남깁니다."""
+    from docx.oxml.ns import qn
+
+    body = doc.element.body
+    for child in list(body):
+        if child.tag != qn("w:sectPr"):
+            body.remove(child)
+
+
+class DocumentFactory:
+    """스타일을 미리 적용한 기본 문서를 한 번 만들어 bytes로 보관하고,
+    내보낼 때마다 그 bytes에서 새 문서를 엽니다.
+
+    서식 템플릿(.docx)을 주면 그 문서의 스타일을 그대로 사용하고 본문만 비웁니다.
+    템플릿이 없으면 python-docx 기본 템플릿에 `font_name` 글꼴을 적용하고,
+    쓰지 않는 스타일을 정리해 문서를 여는 비용을 줄입니다.
+    """
+
+    def __init__(self, font_name, font_size=11, template_path=None):
+        self.font_name = font_name
+        self.font_size = font_size
+        self.template_path = None
+        self._base_bytes = None
+        self._style_names = frozenset()
+        self._lock = threading.Lock()
+        if template_path:
+            self.load_template(template_path)
+
+    @property
+    def table_font(self):
+        """표 셀에 지정할 글꼴. 서식 템플릿을 쓰면 템플릿 스타일을 따릅니다."""
+        return None if self.template_path else self.font_name
+
+    def load_template(self, template_path):
+        """학교 서식 템플릿을 읽어 기본 문서로 사용합니다. 필요한 스타일이 없으면 ValueError."""
+        with open(template_path, "rb") as f:
+            template_bytes = f.read()
+        base_bytes, style_names = self._build_base(template_bytes)
+        with self._lock:
+            self.template_path = template_path
+            self._base_bytes = base_bytes
+            self._style_names = style_names
+
+    def new_document(self):
+        """기본 문서를 복제한 새 Document 객체를 반환합니다."""
+        from docx import Document
+
+        with self._lock:
+            if self._base_bytes is None:
+                self._base_bytes, self._style_names = self._build_base(None)
+            base_bytes = self._base_bytes
+        return Document(io.BytesIO(base_bytes))
+
+    def list_style(self, ordered, level):
+        """목록 수준(0부터)에 맞는 스타일 이름. 기본 문서에 없으면 첫 수준 스타일."""
+        name = "List Number" if ordered else "List Bullet"
+        if level <= 0:
+            return name
+        nested_name = f"{name} {min(level + 1, 3)}"
+        return nested_name if nested_name in self._style_names else name
+
+    def _build_base(self, template_bytes):
+        # python-docx는 처음 문서를 만들 때 불러옵니다.
+        from docx import Document
+        from docx.shared import Pt
+
+        if template_bytes is None:
+            doc = Document()
+        else:
+            doc = Document(io.BytesIO(template_bytes))
+            _clear_body(doc)
+
+        style_names = {style.name for style in doc.styles}
+        missing = [name for name in REQUIRED_STYLES if name not in style_names]
+        if missing:
+            raise ValueError(
+                f"DOCX 서식 템플릿에 필요한 스타일이 없습니다: {', '.join(missing)}"
+            )
+
+        if template_bytes is None:
+            _set_style_font(doc.styles["Normal"], self.font_name, Pt(self.font_size))
+            for name in HEADING_STYLES + ("Quote", "Table Grid"):
+                _set_style_font(doc.styles[name], self.font_name)
+            _prune_styles(
+                doc, set(REQUIRED_STYLES + HEADING_STYLES + NESTED_LIST_STYLES)
+            )
+
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        return buffer.getvalue(), frozenset(style.name for style in doc.styles)
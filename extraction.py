@@ -0,0 +1,151 @@
+import io
+import multiprocessing
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from ocr import ocr_available, ocr_pages
+from utils import get_env_int
+
+# --- Configuration ---
+# 이 쪽수보다 작은 PDF는 프로세스 풀을 거치지 않고 현재 프로세스에서 추출합니다.
+PARALLEL_MIN_PAGES = get_env_int("PDF_PARALLEL_MIN_PAGES", 16)
+PAGES_PER_TASK = get_env_int("PDF_PAGES_PER_TASK", 8)
+PDF_WORKERS = get_env_int("PDF_WORKERS", min(4, os.cpu_count() or 1))
+
+PageText = namedtuple("PageText", ["index", "text", "error"])
+ExtractionResult = namedtuple(
+    "ExtractionResult",
+    ["pages", "failed_pages", "total_pages", "truncated", "ocr_incomplete"],
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_process_pool():
+    """페이지 추출용 프로세스 풀을 반환합니다. 처음 호출할 때 생성합니다.
+
+    풀을 만들 때는 이미 Streamlit 서버, 스케줄러, 지표 서버 등의 스레드가 돌고 있으므로
+    fork 대신 forkserver(없으면 spawn)로 작업 프로세스를 시작해 잠금 상태를 물려받지
+    않게 합니다.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            methods = multiprocessing.get_all_start_methods()
+            method = "forkserver" if "forkserver" in methods else "spawn"
+            _executor = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS,
+                mp_context=multiprocessing.get_context(method),
+            )
+        return _executor
+
+
+def _open_pdf(pdf_bytes):
+    # PyPDF2는 처음 추출할 때 불러옵니다 (앱/작업 프로세스 시작 비용 절감).
+    import PyPDF2
+
+    return PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+
+
+def _extract_page(reader, index):
+    try:
+        return PageText(index, reader.pages[index].extract_text() or "", None)
+    except Exception as e:
+        return PageText(index, "", str(e))
+
+
+def _extract_page_range(pdf_bytes, start, stop):
+    """작업 프로세스에서 [start, stop) 범위의 페이지 텍스트를 추출합니다."""
+    reader = _open_pdf(pdf_bytes)
+    return [_extract_page(reader, i) for i in range(start, stop)]
+
+
+def iter_pdf_pages(reader, pdf_bytes, page_count, max_chars=None):
+    """앞에서부터 `page_count`쪽을 추출하여 PageText로 하나씩 반환하는 제너레이터입니다.
+
+    페이지 수가 많으면 여러 페이지 묶음을 프로세스 풀에 나누어 맡기고, 묶음이 끝나는
+    대로 순서대로 내보냅니다. `max_chars`에 도달하면 남은 작업을 취소하고 멈춥니다.
+    """
+    chars = 0
+    if page_count < PARALLEL_MIN_PAGES or PDF_WORKERS <= 1:
+        for i in range(page_count):
+            page = _extract_page(reader, i)
+            yield page
+            chars += len(page.text)
+            if max_chars and chars >= max_chars:
+                return
+        return
+
+    executor = get_process_pool()
+    ranges = [
+        (start, min(start + PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, PAGES_PER_TASK)
+    ]
+    # 예산에 일찍 도달할 수 있으므로 한 번에 일부 묶음만 제출합니다.
+    in_flight = PDF_WORKERS * 2
+    futures = [
+        executor.submit(_extract_page_range, pdf_bytes, start, stop)
+        for start, stop in ranges[:in_flight]
+    ]
+    next_range = len(futures)
+    try:
+        for i in range(len(ranges)):
+            pages = futures[i].result()
+            futures[i] = None  # 결과를 받은 묶음은 참조를 놓아 메모리를 회수
+            if next_range < len(ranges):
+                start, stop = ranges[next_range]
+                futures.append(
+                    executor.submit(_extract_page_range, pdf_bytes, start, stop)
+                )
+                next_range += 1
+            for page in pages:
+                yield page
+                chars += len(page.text)
+                if max_chars and chars >= max_chars:
+                    return
+    finally:
+        for future in futures:
+            if future is not None:
+                future.cancel()
+
+
+def extract_pdf(pdf_bytes, max_pages=None, max_chars=None, ocr=False):
+    """PDF 바이트에서 페이지별 텍스트를 추출하여 ExtractionResult로 반환합니다.
+
+    추출에 실패한 페이지는 빈 문자열로 두고 `failed_pages`에 (페이지 번호, 오류)로
+    기록합니다.
+    `ocr`이면 텍스트 층이 없는 페이지를 OCR로 채우며, 시간 예산 안에 끝내지 못했거나
+    OCR 오류가 난 페이지가 있으면 `ocr_incomplete`가 True입니다.
+    """
+    reader = _open_pdf(pdf_bytes)
+    total_pages = len(reader.pages)
+    page_count = min(total_pages, max_pages) if max_pages else total_pages
+
+    pages = iter_pdf_pages(reader, pdf_bytes, page_count, max_chars)
+    ocr_incomplete = False
+    if ocr and ocr_available():
+        # 텍스트 층이 없는 페이지를 모아 OCR하므로 이때만 전체 페이지를 먼저 모읍니다.
+        pages, ocr_incomplete = ocr_pages(reader, pdf_bytes, list(pages))
+
+    texts = []
+    failed_pages = []
+    chars = 0
+    for page in pages:
+        if max_chars and chars >= max_chars:
+            break  # OCR로 채운 텍스트까지 포함해 예산에 도달
+        if page.error is not None:
+            failed_pages.append((page.index, page.error))
+        texts.append(page.text)
+        chars += len(page.text)
+
+    truncated = len(texts) < total_pages
+    if max_chars and chars > max_chars:
+        # 마지막 페이지에서 예산을 넘긴 부분은 잘라냅니다.
+        texts[-1] = texts[-1][: len(texts[-1]) - (chars - max_chars)]
+        truncated = True
+    return ExtractionResult(
+        texts, failed_pages, total_pages, truncated, ocr_incomplete
+    )
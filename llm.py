@@ -0,0 +1,294 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import content_hash
+from utils import get_api_key, get_env_float, get_env_int
+
+# --- Configuration ---
+GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 10000,
+    "response_mime_type": "text/plain",
+}
+
+MODEL_NAME = "gemini-1.5-flash"  # or "gemini-pro" if preferred
+# 다른 주소의 Gemini 호환 서버(부하 테스트용 가짜 서버 등)를 쓸 때 설정합니다.
+# 예: http://127.0.0.1:8765 (REST 방식으로 연결)
+API_ENDPOINT = os.environ.get("GEMINI_API_ENDPOINT")
+# 동기 스트림을 비동기로 읽을 때 쓰는 스레드 수. 동시에 진행하는 스트림 수보다 적으면
+# 스트림이 스레드를 기다리느라 첫 청크가 늦어집니다 (asyncio 기본 실행기는
+# min(32, CPU 수 + 4)개).
+STREAM_THREADS = get_env_int("LLM_STREAM_THREADS", 32)
+
+_stream_executor = None
+_stream_executor_lock = threading.Lock()
+
+
+def get_stream_executor():
+    """동기 스트림을 읽는 전용 스레드 풀을 반환합니다. 처음 호출할 때 생성합니다."""
+    global _stream_executor
+    with _stream_executor_lock:
+        if _stream_executor is None:
+            _stream_executor = ThreadPoolExecutor(
+                max_workers=max(1, STREAM_THREADS), thread_name_prefix="llm-stream"
+            )
+        return _stream_executor
+
+
+class LLMBackend:
+    """스트리밍 텍스트 생성 백엔드의 공통 인터페이스입니다."""
+
+    name = "base"
+
+    def stream(self, prompt_text):
+        """프롬프트에 대한 응답 텍스트 청크를 순서대로 반환하는 이터레이터."""
+        raise NotImplementedError
+
+    async def astream(self, prompt_text):
+        """`stream()`의 비동기 버전. 기본 구현은 동기 스트림을 전용 스레드 풀에서 읽습니다."""
+        loop = asyncio.get_running_loop()
+        executor = get_stream_executor()
+        iterator = iter(self.stream(prompt_text))
+        done = object()
+        try:
+            while True:
+                text = await loop.run_in_executor(executor, next, iterator, done)
+                if text is done:
+                    return
+                yield text
+        finally:
+            if hasattr(iterator, "close"):
+                iterator.close()
+
+    def cache_identity(self):
+        """결과 캐시 키에 포함할 백엔드 식별 문자열 (모델, 설정 등)."""
+        return self.name
+
+    def transport(self):
+        """응답을 받는 경로 설명 (부하 테스트 보고용)."""
+        return f"동기 스트림 → 스레드 풀 {STREAM_THREADS}개"
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini 백엔드. SDK 임포트와 모델 생성은 처음 호출할 때 합니다.
+
+    `api_endpoint`를 주면 해당 주소로 REST 방식으로 연결합니다.
+    """
+
+    name = "gemini"
+
+    def __init__(
+        self,
+        model_name=MODEL_NAME,
+        generation_config=None,
+        api_key=None,
+        api_endpoint=API_ENDPOINT,
+    ):
+        self.model_name = model_name
+        self.generation_config = dict(generation_config or GENERATION_CONFIG)
+        self.api_endpoint = api_endpoint
+        self._api_key = api_key
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                api_key = self._api_key or get_api_key()
+                if not api_key:
+                    raise ValueError("GEMINI_API_KEY가 .env 파일에 설정되지 않았습니다.")
+
+                import google.generativeai as genai
+
+                if self.api_endpoint:
+                    genai.configure(
+                        api_key=api_key,
+                        transport="rest",
+                        client_options={"api_endpoint": self.api_endpoint},
+                    )
+                else:
+                    genai.configure(api_key=api_key)
+                # Using a recommended model, adjust if needed
+                self._model = genai.GenerativeModel(
+                    model_name=self.model_name,
+                    generation_config=self.generation_config,
+                )
+            return self._model
+
+    def stream(self, prompt_text):
+        # stream=True로 설정하여 응답을 청크 단위로 받음
+        response_stream = self._get_model().generate_content([prompt_text], stream=True)
+        for chunk in response_stream:
+            # Check if the chunk has text content and it's not empty
+            if hasattr(chunk, "text") and chunk.text:
+                yield chunk.text
+
+    async def astream(self, prompt_text):
+        if self.api_endpoint:
+            # REST 연결은 SDK의 비동기 스트리밍을 지원하지 않으므로 스레드에서 읽습니다.
+            async for text in super().astream(prompt_text):
+                yield text
+            return
+        response_stream = await self._get_model().generate_content_async(
+            [prompt_text], stream=True
+        )
+        async for chunk in response_stream:
+            if hasattr(chunk, "text") and chunk.text:
+                yield chunk.text
+
+    def cache_identity(self):
+        identity = self.model_name + json.dumps(self.generation_config, sort_keys=True)
+        return identity + (self.api_endpoint or "")
+
+    def transport(self):
+        if self.api_endpoint:
+            return f"REST 동기 스트림 → 스레드 풀 {STREAM_THREADS}개"
+        return "gRPC 비동기 스트림"
+
+
+def _chunked(text, chunk_chars, chunk_delay, first_chunk_delay):
+    if first_chunk_delay:
+        time.sleep(first_chunk_delay)
+    for start in range(0, len(text), chunk_chars):
+        if chunk_delay and start:
+            time.sleep(chunk_delay)
+        yield text[start : start + chunk_chars]
+
+
+class FakeBackend(LLMBackend):
+    """네트워크 없이 정해진 응답을 청크 단위로 흘려보내는 가짜 백엔드입니다.
+
+    `response_text`가 없으면 프롬프트 길이를 담은 간단한 마크다운 문서를 만듭니다.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self, response_text=None, chunk_chars=40, chunk_delay=0.0, first_chunk_delay=0.0
+    ):
+        self.response_text = response_text
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_delay
+        self.first_chunk_delay = first_chunk_delay
+        self.calls = 0
+
+    def respond(self, prompt_text):
+        """프롬프트에 대한 전체 응답 텍스트를 반환합니다."""
+        if self.response_text is not None:
+            return self.response_text
+        return (
+            "# 생성 결과 (테스트)\n\n"
+            f"프롬프트 {len(prompt_text)}자를 받았습니다.\n\n"
+            "| 항목 | 내용 |\n|---|---|\n| 상태 | 완료 |\n"
+        )
+
+    def stream(self, prompt_text):
+        self.calls += 1
+        return _chunked(
+            self.respond(prompt_text),
+            self.chunk_chars,
+            self.chunk_delay,
+            self.first_chunk_delay,
+        )
+
+    async def astream(self, prompt_text):
+        # 스레드를 쓰지 않고 이벤트 루프에서 지연을 흉내 냅니다 (부하 테스트용).
+        self.calls += 1
+        text = self.respond(prompt_text)
+        if self.first_chunk_delay:
+            await asyncio.sleep(self.first_chunk_delay)
+        for start in range(0, len(text), self.chunk_chars):
+            if self.chunk_delay and start:
+                await asyncio.sleep(self.chunk_delay)
+            yield text[start : start + self.chunk_chars]
+
+    def cache_identity(self):
+        return f"fake:{content_hash(self.response_text or '')}"
+
+    def transport(self):
+        return "가짜 응답 (이벤트 루프에서 지연)"
+
+
+class ReplayBackend(LLMBackend):
+    """기록해 둔 응답을 재생하는 백엔드입니다.
+
+    JSONL 파일의 각 줄은 {"prompt": ..., "response": ...} 또는
+    {"prompt_sha256": ..., "response": ...} 형식입니다. 기록에 없는 프롬프트는
+    `fallback` 백엔드로 넘기고, 없으면 LookupError를 발생시킵니다.
+    """
+
+    name = "replay"
+
+    def __init__(self, path, fallback=None, chunk_chars=40, chunk_delay=0.0):
+        self.path = path
+        self.fallback = fallback
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_delay
+        self._responses = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                key = record.get("prompt_sha256") or content_hash(record["prompt"])
+                self._responses[key] = record["response"]
+
+    def stream(self, prompt_text):
+        response = self._responses.get(content_hash(prompt_text))
+        if response is None:
+            if self.fallback is None:
+                raise LookupError("재생 파일에 없는 프롬프트입니다.")
+            return self.fallback.stream(prompt_text)
+        return _chunked(response, self.chunk_chars, self.chunk_delay, 0.0)
+
+    def cache_identity(self):
+        return f"replay:{self.path}"
+
+
+# --- Backend Selection ---
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(kind=None):
+    """LLM_BACKEND 환경 변수(gemini, fake, replay)에 따라 백엔드를 만듭니다."""
+    kind = (kind or os.environ.get("LLM_BACKEND") or "gemini").lower()
+    chunk_delay = get_env_float("FAKE_LLM_CHUNK_DELAY", 0.0)
+    if kind == "gemini":
+        return GeminiBackend()
+    if kind == "fake":
+        return FakeBackend(
+            chunk_chars=get_env_int("FAKE_LLM_CHUNK_CHARS", 40),
+            chunk_delay=chunk_delay,
+            first_chunk_delay=get_env_float("FAKE_LLM_FIRST_CHUNK_DELAY", 0.0),
+        )
+    if kind == "replay":
+        return ReplayBackend(
+            os.environ["LLM_REPLAY_FILE"],
+            fallback=FakeBackend(),
+            chunk_delay=chunk_delay,
+        )
+    raise ValueError(f"알 수 없는 LLM_BACKEND 값입니다: {kind}")
+
+
+def get_backend():
+    """프로세스 전체에서 공유하는 백엔드를 반환합니다. 처음 호출할 때 만듭니다."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend()
+        return _backend
+
+
+def set_backend(backend):
+    """사용할 백엔드를 교체하고 이전 백엔드를 반환합니다 (테스트, 배치 실행 등)."""
+    global _backend
+    with _backend_lock:
+        previous, _backend = _backend, backend
+        return previous
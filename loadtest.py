@@ -0,0 +1,440 @@
+"""다중 사용자 부하 테스트: 가짜 Gemini 스트리밍 서버와 동시 세션.
+
+로컬에 Gemini REST API를 흉내 내는 스트리밍 서버를 띄우고, 동시 세션 수를 늘려 가며
+각 세션이 앱과 같은 흐름(서식 업로드 → 추출 → 생성 스트리밍 → DOCX 변환 → 다운로드)을
+거치게 합니다. 세션은 Streamlit AppTest로 실행하고, 작업 프로세스 하나가 Streamlit
+인스턴스 하나에 해당합니다. API 키와 네트워크 없이 실행됩니다.
+가짜 서버에는 REST로 연결하므로 운영 환경의 gRPC 비동기 스트림과 경로가 다르며,
+측정한 경로는 결과 표 아래에 표시합니다.
+
+    python loadtest.py                                  # 동시 세션 1, 2, 4, 8, 16
+    python loadtest.py --sessions 8 32 64 --workers 2   # 인스턴스 2개에 나누어 실행
+    python loadtest.py --latency 1.5 --chunk-rate 20 --json result.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import get_context
+
+logger = logging.getLogger(__name__)
+
+SESSION_TIMEOUT = 600  # 초
+# AppTest의 첫 실행(세션 생성)은 동시에 하면 충돌할 수 있어 하나씩 합니다.
+_setup_lock = threading.Lock()
+INSTRUCTIONS = "이 서식으로 2025학년도 프로젝트 학습 계획서를 작성해주세요. (세션 {index})"
+
+
+# --- Fake Gemini Server ---
+class FakeGeminiServer:
+    """Gemini REST `streamGenerateContent`를 흉내 내는 로컬 HTTP 서버입니다.
+
+    요청마다 `latency`초 뒤 첫 청크를 보내고, 이후 초당 `chunk_rate`개의 청크로
+    `response_text`를 `chunk_chars` 글자씩 나누어 보냅니다.
+    """
+
+    def __init__(
+        self,
+        response_text,
+        latency=0.5,
+        chunk_chars=40,
+        chunk_rate=50.0,
+        host="127.0.0.1",
+        port=0,
+    ):
+        self.response_text = response_text
+        self.latency = latency
+        self.chunk_chars = chunk_chars
+        self.chunk_rate = chunk_rate
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def _chunks(self):
+        text = self.response_text
+        for start in range(0, len(text), self.chunk_chars):
+            yield text[start : start + self.chunk_chars]
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                self.rfile.read(length)
+                server._count_request()
+                path = self.path.split("?")[0]
+                if path.endswith(":streamGenerateContent"):
+                    self._stream()
+                elif path.endswith(":generateContent"):
+                    time.sleep(server.latency)
+                    self._send_json(_response_json(server.response_text))
+                else:
+                    self.send_error(404)
+
+            def _stream(self):
+                # REST 스트리밍 응답은 청크 단위로 전송되는 JSON 배열입니다.
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                time.sleep(server.latency)
+                interval = 1.0 / server.chunk_rate if server.chunk_rate else 0.0
+                self._write_chunk(b"[")
+                for index, text in enumerate(server._chunks()):
+                    if index and interval:
+                        time.sleep(interval)
+                    separator = b"," if index else b""
+                    self._write_chunk(separator + _response_json(text))
+                self._write_chunk(b"]")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _write_chunk(self, data):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def _send_json(self, body):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # 요청마다 로그를 남기지 않음
+
+        return Handler
+
+
+def _response_json(text):
+    body = {
+        "candidates": [
+            {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+        ]
+    }
+    return json.dumps(body, ensure_ascii=False).encode("utf-8")
+
+
+# --- Session Script ---
+def session_app():
+    """AppTest로 실행하는 세션 스크립트. app.py와 같지만 업로드 파일은 세션 상태에서 읽습니다.
+
+    AppTest는 이 함수의 소스만 실행하므로 필요한 모듈을 안에서 불러옵니다.
+    """
+    import io
+
+    import streamlit as st
+
+    from controller import click_generate_btn
+    from view import (
+        display_faq,
+        display_generate_button,
+        display_header,
+        display_instructions_input,
+    )
+
+    display_header()
+    uploaded_template_file = io.BytesIO(st.session_state["loadtest_template"])
+    uploaded_template_file.name = "template.pdf"
+    user_instructions = display_instructions_input()
+    generate_button_clicked = display_generate_button()
+    display_faq()
+
+    click_generate_btn(
+        (uploaded_template_file, None, user_instructions, generate_button_clicked)
+    )
+
+
+# --- Worker Process ---
+class _GenerationRecords(logging.Handler):
+    """StreamMeter가 남기는 생성 구간 로그에서 첫 청크까지 시간을 모읍니다."""
+
+    def __init__(self):
+        super().__init__()
+        self.ttfc = []
+
+    def emit(self, record):
+        try:
+            data = json.loads(record.getMessage())
+        except ValueError:
+            return
+        if data.get("span") == "generation" and data.get("time_to_first_chunk"):
+            self.ttfc.append(data["time_to_first_chunk"])
+
+
+def _current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return _peak_rss_mb()
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux는 KB, macOS는 바이트 단위입니다.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_session(index, pdf_pages, results, start_barrier):
+    from streamlit.testing.v1 import AppTest
+
+    from artifacts import get_artifact_store
+    from bench import make_text_pdf
+
+    result = {"index": index, "ok": False}
+    try:
+        with _setup_lock:
+            at = AppTest.from_function(session_app, default_timeout=SESSION_TIMEOUT)
+            # 세션마다 내용이 다른 서식을 써서 추출/생성 캐시에 걸리지 않게 합니다.
+            at.session_state["loadtest_template"] = make_text_pdf(
+                pdf_pages, lines_per_page=40 + index
+            )
+            at.run()
+        at.text_area(key="instructions_input").input(INSTRUCTIONS.format(index=index))
+        start_barrier.wait(SESSION_TIMEOUT)
+
+        start = time.perf_counter()
+        at.button(key="generate_button").click().run()
+        generated = time.perf_counter()
+        errors = [e.value for e in at.exception] + [e.value for e in at.error]
+        # 다운로드 버튼이 클릭 시 호출하는 것과 같은 방식으로 DOCX를 읽습니다.
+        session_id = at.session_state["session_id"]
+        docx = get_artifact_store().reader(session_id, "result_docx")()
+        finished = time.perf_counter()
+
+        result.update(
+            ok=not errors and bool(docx),
+            error="; ".join(str(e) for e in errors)[:200] or None,
+            generate_seconds=generated - start,
+            download_seconds=finished - generated,
+            e2e_seconds=finished - start,
+            docx_bytes=len(docx),
+        )
+    except Exception as e:
+        # 시작 전에 실패하면 다른 세션이 기다리지 않도록 출발선을 해제합니다.
+        start_barrier.abort()
+        result["error"] = f"{type(e).__name__}: {e}"
+    results.append(result)
+
+
+def run_worker(session_indexes, pdf_pages):
+    """작업 프로세스(Streamlit 인스턴스 하나)에서 세션들을 동시에 실행합니다."""
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    records = _GenerationRecords()
+    metrics_logger = logging.getLogger("metrics")
+    metrics_logger.setLevel(logging.INFO)
+    metrics_logger.propagate = False
+    metrics_logger.addHandler(records)
+
+    import controller  # noqa: F401  앱 모듈을 미리 불러와 측정에서 제외
+    import llm
+
+    # SDK 로딩과 첫 연결 비용이 첫 세션의 측정값에 섞이지 않도록 미리 한 번 호출합니다.
+    for _ in llm.get_backend().stream("warmup"):
+        pass
+
+    rss_start = _current_rss_mb()
+    rss_peak = rss_start
+    sampling = threading.Event()
+
+    def sample_rss():
+        nonlocal rss_peak
+        while not sampling.wait(0.05):
+            rss_peak = max(rss_peak, _current_rss_mb())
+
+    sampler = threading.Thread(target=sample_rss, daemon=True)
+    sampler.start()
+
+    results = []
+    barrier = threading.Barrier(len(session_indexes))
+    threads = [
+        threading.Thread(target=_run_session, args=(i, pdf_pages, results, barrier))
+        for i in session_indexes
+    ]
+    cpu_start = sum(os.times()[:2])
+    wall_start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - wall_start
+    cpu = sum(os.times()[:2]) - cpu_start
+    sampling.set()
+    sampler.join()
+
+    return {
+        "pid": os.getpid(),
+        "sessions": results,
+        "ttfc": records.ttfc,
+        "cpu_seconds": cpu,
+        "cpu_percent": 100.0 * cpu / wall if wall else 0.0,
+        "rss_start_mb": rss_start,
+        "rss_peak_mb": max(rss_peak, _current_rss_mb()),
+        "wall_seconds": wall,
+        "transport": llm.get_backend().transport(),
+    }
+
+
+# --- Driver ---
+def percentile(values, q):
+    """선형 보간 백분위수. 값이 없으면 None."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def run_level(sessions, workers, pdf_pages):
+    """동시 세션 `sessions`개를 `workers`개 프로세스에 나누어 실행하고 요약을 반환합니다."""
+    workers = max(1, min(workers, sessions))
+    groups = [list(range(sessions))[w::workers] for w in range(workers)]
+    # 단계마다 새 프로세스를 띄워 메모리 사용량이 이전 단계의 영향을 받지 않게 합니다.
+    with ProcessPoolExecutor(workers, mp_context=get_context("spawn")) as pool:
+        futures = [pool.submit(run_worker, group, pdf_pages) for group in groups]
+        reports = [future.result() for future in futures]
+
+    session_results = [s for report in reports for s in report["sessions"]]
+    ok = [s for s in session_results if s["ok"]]
+    ttfc = [t for report in reports for t in report["ttfc"]]
+    e2e = [s["e2e_seconds"] for s in ok]
+    wall = max(report["wall_seconds"] for report in reports)
+    summary = {
+        "sessions": sessions,
+        "workers": workers,
+        "ok": len(ok),
+        "errors": [s["error"] for s in session_results if not s["ok"]],
+        "throughput_per_minute": 60.0 * len(ok) / wall if wall else 0.0,
+        "transport": reports[0]["transport"],
+        "workers_detail": [
+            {
+                key: value
+                for key, value in report.items()
+                if key not in ("sessions", "ttfc", "transport")
+            }
+            for report in reports
+        ],
+    }
+    for q in (50, 95, 99):
+        summary[f"ttfc_p{q}"] = percentile(ttfc, q)
+        summary[f"e2e_p{q}"] = percentile(e2e, q)
+    return summary
+
+
+def _fmt(value, spec=".2f"):
+    return "-" if value is None else format(value, spec)
+
+
+def print_table(levels):
+    header = (
+        f"{'sessions':>8} {'ok':>5} {'ttfc p50':>9} {'p95':>7} {'p99':>7} "
+        f"{'e2e p50':>8} {'p95':>7} {'p99':>7} {'/min':>7} "
+        f"{'worker cpu%':>14} {'rss MB (peak)':>16}"
+    )
+    print(header)
+    print("-" * len(header))
+    for level in levels:
+        details = level["workers_detail"]
+        cpu = "/".join(f"{d['cpu_percent']:.0f}" for d in details)
+        rss = "/".join(f"{d['rss_peak_mb']:.0f}" for d in details)
+        print(
+            f"{level['sessions']:>8} {level['ok']:>5} "
+            f"{_fmt(level['ttfc_p50']):>9} {_fmt(level['ttfc_p95']):>7} "
+            f"{_fmt(level['ttfc_p99']):>7} {_fmt(level['e2e_p50']):>8} "
+            f"{_fmt(level['e2e_p95']):>7} {_fmt(level['e2e_p99']):>7} "
+            f"{level['throughput_per_minute']:>7.1f} {cpu:>14} {rss:>16}"
+        )
+    print("\n시간 단위: 초, cpu%/rss는 작업 프로세스별 값 (100% = 코어 하나)")
+    if levels:
+        # 운영 환경(API 키, 기본 주소)은 gRPC 비동기 스트림을 쓰므로 경로가 다릅니다.
+        print(f"측정한 LLM 경로: {levels[0]['transport']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--workers", type=int, default=1, help="작업 프로세스 수")
+    parser.add_argument("--pages", type=int, default=4, help="서식 PDF 쪽수")
+    parser.add_argument("--rows", type=int, default=40, help="응답 표 행 수")
+    parser.add_argument("--latency", type=float, default=0.5, help="첫 청크까지 초")
+    parser.add_argument("--chunk-rate", type=float, default=50.0, help="초당 청크 수")
+    parser.add_argument("--chunk-chars", type=int, default=40)
+    parser.add_argument("--json", metavar="PATH", help="결과를 JSON으로 저장")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    from bench import make_markdown
+
+    server = FakeGeminiServer(
+        make_markdown(args.rows, list_items=10, sections=3),
+        latency=args.latency,
+        chunk_chars=args.chunk_chars,
+        chunk_rate=args.chunk_rate,
+    ).start()
+    # 작업 프로세스는 이 환경 변수를 물려받아 가짜 서버로 연결합니다.
+    # REST 연결은 스트림마다 스레드 하나가 필요하므로, 스레드 수가 첫 청크 지연을
+    # 좌우하지 않도록 세션 수만큼 둡니다.
+    os.environ.update(
+        LLM_BACKEND="gemini",
+        GEMINI_API_ENDPOINT=server.url,
+        GEMINI_API_KEY="loadtest",
+        LLM_STREAM_THREADS=str(max(args.sessions)),
+    )
+    os.environ.pop("CACHE_DIR", None)
+
+    levels = []
+    try:
+        for sessions in args.sessions:
+            level = run_level(sessions, args.workers, args.pages)
+            levels.append(level)
+            for error in level["errors"][:3]:
+                print(f"[{sessions}] 오류: {error}", file=sys.stderr)
+    finally:
+        server.stop()
+
+    print_table(levels)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {"config": vars(args), "levels": levels},
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+    return 1 if any(level["errors"] for level in levels) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,444 @@
+import html
+import re
+
+# 줄 끝 문자 (str.splitlines 기준)
+LINE_BREAKS = "\r\n\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+
+# --- Markdown Patterns ---
+HEADING_RE = re.compile(r"^(#+)\s*(.*)")
+BULLET_ITEM_RE = re.compile(r"^[-*+]\s+")
+NUMBERED_ITEM_RE = re.compile(r"^\d+\.\s")
+RULE_RE = re.compile(r"^(?:-{3,}|\*{3,}|_{3,})$")
+FENCE_RE = re.compile(r"^(`{3,}|~{3,})\s*([\w+-]*)")
+TABLE_SEPARATOR_RE = re.compile(r"^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)+\|?\s*$")
+INLINE_CODE_RE = re.compile(r"`([^`]+)`")
+INLINE_STRONG_EM_RE = re.compile(r"\*\*\*(.+?)\*\*\*")
+INLINE_STRONG_RE = re.compile(r"\*\*(.+?)\*\*")
+INLINE_EM_RE = re.compile(r"\*(.+?)\*")
+INLINE_LINK_RE = re.compile(r"\[([^\]]+)\]\(((?:https?://|mailto:)[^)\s]+)\)")
+INLINE_MARKER_RE = re.compile(r"[*_`]")
+# 하위 목록으로 볼 최소 추가 들여쓰기 (칸)
+LIST_NEST_INDENT = 2
+
+
+# --- Block Nodes ---
+class Node:
+    """블록 노드의 공통 기반 클래스입니다. 비교와 표현은 __slots__ 기준입니다."""
+
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Heading(Node):
+    __slots__ = ("level", "text")
+
+    def __init__(self, level, text):
+        self.level = level
+        self.text = text
+
+
+class Paragraph(Node):
+    __slots__ = ("lines",)
+
+    def __init__(self, lines):
+        self.lines = lines
+
+
+class ListBlock(Node):
+    """목록입니다. `levels`는 항목별 들여쓰기 수준(0부터), `ordered_items`는 항목별
+    번호 목록 여부입니다 (하위 목록은 상위 목록과 종류가 다를 수 있음)."""
+
+    __slots__ = ("ordered", "items", "levels", "ordered_items")
+
+    def __init__(self, ordered, items, levels=None, ordered_items=None):
+        self.ordered = ordered
+        self.items = items
+        self.levels = levels or [0] * len(items)
+        self.ordered_items = ordered_items or [ordered] * len(items)
+
+
+class Table(Node):
+    __slots__ = ("header", "rows")
+
+    def __init__(self, header, rows):
+        self.header = header  # 헤더 구분줄이 없으면 None
+        self.rows = rows
+
+
+class CodeBlock(Node):
+    __slots__ = ("language", "text")
+
+    def __init__(self, language, text):
+        self.language = language
+        self.text = text
+
+
+class BlockQuote(Node):
+    __slots__ = ("lines",)
+
+    def __init__(self, lines):
+        self.lines = lines
+
+
+class Rule(Node):
+    __slots__ = ()
+
+
+def split_table_cells(line):
+    """표 행을 셀 목록으로 나눕니다.
+
+    양 끝의 '|'만 떼어 내고, 가운데 빈 셀은 ""로 남겨 열 위치를 유지합니다.
+    """
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|"):
+        line = line[:-1]
+    return [cell.strip() for cell in line.split("|")]
+
+
+# --- Parser ---
+class BlockParser:
+    """마크다운을 줄 단위로 읽어 블록 노드로 바꾸는 점진적 파서입니다.
+
+    `feed()`는 청크를 받아 그 시점에 완성된 블록 목록을, `close()`는 남은 블록을
+    반환합니다. 한 번에 전체 텍스트를 넣어도, 여러 청크로 나누어 넣어도 결과는 같습니다.
+    `spans`에는 반환한 블록마다 원문 줄 범위 (시작, 끝)를 순서대로 보관합니다
+    (0부터 센 `splitlines()` 줄 번호, 끝은 포함하지 않음).
+    """
+
+    def __init__(self):
+        self._buffer = ""  # 아직 줄바꿈이 오지 않은 마지막 줄
+        self._held = None  # 다음 줄이 헤더 구분줄인지 확인해야 하는 '|' 포함 줄
+        self._held_index = 0
+        self._kind = None  # 열려 있는 블록 종류
+        self._lines = []
+        self._ordered = False
+        self._levels = []  # 목록 항목별 수준
+        self._ordered_items = []  # 목록 항목별 번호 목록 여부
+        self._indents = []  # 열린 목록 수준별 들여쓰기 칸 수
+        self._header = None
+        self._fence = None
+        self._language = ""
+        self._line_count = 0  # 지금까지 읽은 줄 수
+        self._start = 0  # 열려 있는 블록의 첫 줄 번호
+        self._end = 0  # 열려 있는 블록의 마지막 줄 번호 + 1
+        self.spans = []
+
+    def feed(self, chunk):
+        """청크를 추가하고, 완성된 블록 목록을 반환합니다."""
+        lines = (self._buffer + chunk).splitlines(keepends=True)
+        self._buffer = ""
+        # 줄바꿈으로 끝나지 않았거나 "\r\n"이 나뉘어 올 수 있는 줄은 남겨 둡니다.
+        if lines and (
+            lines[-1].rstrip(LINE_BREAKS) == lines[-1] or lines[-1].endswith("\r")
+        ):
+            self._buffer = lines.pop()
+        blocks = []
+        for line in lines:
+            self._add_line(line.rstrip(LINE_BREAKS), blocks)
+        return blocks
+
+    def close(self):
+        """남은 줄을 마무리하고 마지막 블록 목록을 반환합니다."""
+        blocks = []
+        for line in self._buffer.splitlines():
+            self._add_line(line, blocks)
+        self._buffer = ""
+        if self._held is not None:
+            held, self._held = self._held, None
+            self._add_plain_line(held, blocks, self._held_index, hold_pipes=False)
+        if self._kind == "code":
+            # 닫히지 않은 코드 블록도 내용은 살립니다.
+            self._fence = None
+        self._close_block(blocks)
+        return blocks
+
+    def _add_line(self, raw_line, blocks):
+        index = self._line_count
+        self._line_count += 1
+        if self._fence is not None:
+            self._end = index + 1
+            if raw_line.strip().startswith(self._fence) and not raw_line.strip(
+                self._fence[0] + " \t"
+            ):
+                self._fence = None
+                self._close_block(blocks)
+            else:
+                self._lines.append(raw_line)
+            return
+
+        line = raw_line.strip()
+        if self._held is not None:
+            held, self._held = self._held, None
+            if TABLE_SEPARATOR_RE.match(line):
+                self._close_block(blocks)
+                self._open("table", self._held_index)
+                self._end = index + 1
+                self._header = split_table_cells(held)
+                return  # 구분선은 건너뛰기
+            self._add_plain_line(held, blocks, self._held_index, hold_pipes=False)
+        indent = len(raw_line.expandtabs(4)) - len(raw_line.expandtabs(4).lstrip())
+        self._add_plain_line(line, blocks, index, indent=indent)
+
+    def _add_plain_line(self, line, blocks, index, hold_pipes=True, indent=0):
+        if not line:
+            self._close_block(blocks)
+            return
+
+        if self._kind == "table" and "|" in line:
+            self._lines.append(split_table_cells(line))
+            self._end = index + 1
+            return
+
+        fence = FENCE_RE.match(line)
+        if fence:
+            self._close_block(blocks)
+            self._open("code", index)
+            self._fence = fence.group(1)
+            self._language = fence.group(2)
+            return
+
+        heading = HEADING_RE.match(line)
+        if heading:
+            self._close_block(blocks)
+            self._append(
+                blocks, Heading(len(heading.group(1)), heading.group(2).strip()), index
+            )
+            return
+
+        if RULE_RE.match(line):
+            self._close_block(blocks)
+            self._append(blocks, Rule(), index)
+            return
+
+        for ordered, pattern in ((False, BULLET_ITEM_RE), (True, NUMBERED_ITEM_RE)):
+            if pattern.match(line):
+                level = self._list_level(indent) if self._kind == "list" else 0
+                if self._kind != "list" or (level == 0 and self._ordered != ordered):
+                    self._close_block(blocks)
+                    self._open("list", index)
+                    self._ordered = ordered
+                    self._indents = [indent]
+                    level = 0
+                self._lines.append(pattern.sub("", line, count=1).strip())
+                self._levels.append(level)
+                self._ordered_items.append(ordered)
+                self._end = index + 1
+                return
+
+        if line.startswith(">"):
+            if self._kind != "quote":
+                self._close_block(blocks)
+                self._open("quote", index)
+            self._lines.append(line[1:].strip())
+            self._end = index + 1
+            return
+
+        if "|" in line:
+            if hold_pipes:
+                self._held = line
+                self._held_index = index
+                return
+            if line.startswith("|"):
+                # 헤더 구분줄이 없는 표
+                if self._kind != "table":
+                    self._close_block(blocks)
+                    self._open("table", index)
+                self._lines.append(split_table_cells(line))
+                self._end = index + 1
+                return
+
+        if self._kind != "paragraph":
+            self._close_block(blocks)
+            self._open("paragraph", index)
+        self._lines.append(line)
+        self._end = index + 1
+
+    def _open(self, kind, index):
+        self._kind = kind
+        self._start = index
+        self._end = index + 1
+
+    def _append(self, blocks, block, index):
+        blocks.append(block)
+        self.spans.append((index, index + 1))
+
+    def _list_level(self, indent):
+        """열린 목록에서 `indent`칸 들여쓴 항목의 수준을 구합니다.
+
+        바로 앞 항목보다 `LIST_NEST_INDENT`칸 이상 더 들여썼으면 한 수준만 깊어지고,
+        덜 들여썼으면 들여쓰기가 같거나 더 작은 상위 수준으로 돌아갑니다.
+        """
+        while len(self._indents) > 1 and indent < self._indents[-1]:
+            self._indents.pop()
+        if indent >= self._indents[-1] + LIST_NEST_INDENT:
+            self._indents.append(indent)
+        elif indent < self._indents[-1]:
+            self._indents[-1] = indent  # 첫 항목보다 덜 들여쓴 경우
+        return len(self._indents) - 1
+
+    def _close_block(self, blocks):
+        kind, lines = self._kind, self._lines
+        if kind is None or self._fence is not None:
+            return
+        if kind == "paragraph":
+            block = Paragraph(lines)
+        elif kind == "list":
+            block = ListBlock(self._ordered, lines, self._levels, self._ordered_items)
+        elif kind == "quote":
+            block = BlockQuote(lines)
+        elif kind == "code":
+            block = CodeBlock(self._language, "\n".join(lines))
+        elif kind == "table":
+            block = Table(self._header, lines)
+        blocks.append(block)
+        self.spans.append((self._start, self._end))
+        self._kind = None
+        self._lines = []
+        self._levels = []
+        self._ordered_items = []
+        self._indents = []
+        self._header = None
+        self._language = ""
+
+
+def parse_markdown(markdown_text):
+    """마크다운 텍스트 전체를 블록 노드 목록으로 파싱합니다."""
+    parser = BlockParser()
+    return parser.feed(markdown_text) + parser.close()
+
+
+# --- HTML Renderer ---
+NEWLINE = "\n"
+
+
+def render_inline_html(text):
+    """인라인 서식(코드, 굵게, 기울임, 링크)을 HTML로 바꿉니다.
+
+    코드 조각은 먼저 떼어 내어 안쪽에는 강조나 링크 규칙을 적용하지 않습니다.
+    """
+    parts = INLINE_CODE_RE.split(text)  # 홀수 번째가 코드 조각 내용
+    return "".join(
+        f"<code>{html.escape(part, quote=False)}</code>"
+        if index % 2
+        else _render_text_html(part)
+        for index, part in enumerate(parts)
+    )
+
+
+def _render_text_html(text):
+    text = html.escape(text, quote=False)
+    text = INLINE_STRONG_EM_RE.sub(r"<strong><em>\1</em></strong>", text)
+    text = INLINE_STRONG_RE.sub(r"<strong>\1</strong>", text)
+    text = INLINE_EM_RE.sub(r"<em>\1</em>", text)
+    return INLINE_LINK_RE.sub(_link_html, text)
+
+
+def _link_html(match):
+    # 주소는 속성값이므로 따옴표까지 이스케이프합니다 (본문은 이미 이스케이프됨).
+    href = html.escape(html.unescape(match.group(2)), quote=True)
+    return f'<a href="{href}">{match.group(1)}</a>'
+
+
+def _table_html(block):
+    rows = ([block.header] if block.header else []) + block.rows
+    num_cols = max((len(row) for row in rows), default=0)
+    parts = ["<table>"]
+    if block.header:
+        cells = block.header + [""] * (num_cols - len(block.header))
+        parts.append("<thead><tr>")
+        parts.extend(f"<th>{render_inline_html(cell)}</th>" for cell in cells)
+        parts.append("</tr></thead>")
+    parts.append("<tbody>")
+    for row in block.rows:
+        cells = row + [""] * (num_cols - len(row))
+        parts.append("<tr>")
+        parts.extend(f"<td>{render_inline_html(cell)}</td>" for cell in cells)
+        parts.append("</tr>")
+    parts.append("</tbody></table>")
+    return "".join(parts)
+
+
+def _list_html(block):
+    parts = []
+    open_lists = []  # 열린 목록의 (수준, 태그)
+    for item, level, ordered in zip(block.items, block.levels, block.ordered_items):
+        while open_lists and open_lists[-1][0] > level:
+            parts.append(f"</li></{open_lists.pop()[1]}>")
+        if open_lists and open_lists[-1][0] == level:
+            parts.append("</li>")
+        else:
+            tag = "ol" if ordered else "ul"
+            parts.append(f"<{tag}>")
+            open_lists.append((level, tag))
+        parts.append(f"<li>{render_inline_html(item)}")
+    while open_lists:
+        parts.append(f"</li></{open_lists.pop()[1]}>")
+    return "".join(parts)
+
+
+def render_block_html(block):
+    """블록 노드 하나를 HTML 문자열로 바꿉니다."""
+    if isinstance(block, Heading):
+        level = min(block.level, 6)
+        return f"<h{level}>{render_inline_html(block.text)}</h{level}>"
+    if isinstance(block, Paragraph):
+        return f"<p>{render_inline_html(NEWLINE.join(block.lines))}</p>"
+    if isinstance(block, ListBlock):
+        return _list_html(block)
+    if isinstance(block, Table):
+        return _table_html(block)
+    if isinstance(block, CodeBlock):
+        css_class = f' class="language-{block.language}"' if block.language else ""
+        return f"<pre><code{css_class}>{html.escape(block.text)}</code></pre>"
+    if isinstance(block, BlockQuote):
+        text = render_inline_html(NEWLINE.join(block.lines))
+        return f"<blockquote><p>{text}</p></blockquote>"
+    if isinstance(block, Rule):
+        return "<hr />"
+    return ""
+
+
+def render_html(blocks):
+    """블록 노드 목록을 HTML 문자열로 바꿉니다."""
+    return "\n".join(render_block_html(block) for block in blocks)
+
+
+# --- Title Extraction ---
+def strip_inline_markers(text):
+    """제목 등 일반 텍스트로 쓸 때 인라인 서식 기호를 지웁니다."""
+    return INLINE_MARKER_RE.sub("", text).strip()
+
+
+def block_title_text(block):
+    """블록에서 제목으로 쓸 수 있는 텍스트를 반환합니다. 없으면 빈 문자열."""
+    if isinstance(block, Heading):
+        text = block.text
+    elif isinstance(block, (Paragraph, BlockQuote)):
+        text = block.lines[0] if block.lines else ""
+    elif isinstance(block, ListBlock):
+        text = block.items[0] if block.items else ""
+    elif isinstance(block, Table):
+        row = block.header or (block.rows[0] if block.rows else [])
+        text = " ".join(row)
+    else:
+        return ""  # 코드 블록, 구분선은 제목으로 쓰지 않음
+    return strip_inline_markers(text)
+
+
+def extract_title(blocks):
+    """문서의 첫 번째 텍스트 블록에서 제목을 추출합니다."""
+    for block in blocks:
+        title = block_title_text(block)
+        if title:
+            return title
+    return ""
@@ -0,0 +1,271 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils import get_env_int
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "docx_ai_"
+
+# 초 단위 지연 시간 구간
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# 문자 수 구간
+SIZE_BUCKETS = (100, 1000, 5000, 10000, 50000, 100000, 500000, 1000000)
+# 초당 청크/문자 수 구간
+RATE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{_escape_label(v)}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """누적 구간(bucket) 히스토그램입니다."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    """카운터/게이지/히스토그램을 모으고 Prometheus 텍스트 형식으로 내보냅니다."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        """카운터를 증가시킵니다."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        """게이지 값을 설정합니다."""
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        """히스토그램에 값을 기록합니다."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, name, **fields):
+        """구간 실행 시간을 재는 컨텍스트 관리자입니다.
+
+        `{name}_seconds` 히스토그램에 기록하고, 구간 정보를 JSON 한 줄로 로그에 남깁니다.
+        블록 안에서 반환된 딕셔너리에 값을 넣으면 로그 필드로 함께 기록됩니다.
+        """
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield fields
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            self.observe(f"{name}_seconds", duration)
+            if status == "error":
+                self.inc(f"{name}_errors_total")
+            record = {"span": name, "status": status, "seconds": round(duration, 4)}
+            record.update(fields)
+            logger.info(json.dumps(record, ensure_ascii=False, default=str))
+            write_metrics_file()
+
+    def render_prometheus(self):
+        """수집한 지표를 Prometheus 텍스트 형식 문자열로 반환합니다."""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {
+                key: (h.buckets, list(h.counts), h.sum, h.count)
+                for key, h in self._histograms.items()
+            }
+
+        lines = []
+        for kind, values in (("counter", counters), ("gauge", gauges)):
+            for name in sorted({name for name, _ in values}):
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} {kind}")
+                for (metric, labels), value in sorted(values.items()):
+                    if metric == name:
+                        labels_text = _format_labels(labels)
+                        lines.append(f"{METRIC_PREFIX}{name}{labels_text} {value}")
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE {METRIC_PREFIX}{name} histogram")
+            for (metric, labels), (buckets, counts, total, count) in sorted(
+                histograms.items()
+            ):
+                if metric != name:
+                    continue
+                for bound, bucket_count in zip(buckets, counts):
+                    le = _format_labels(labels, [("le", bound)])
+                    lines.append(f"{METRIC_PREFIX}{name}_bucket{le} {bucket_count}")
+                le = _format_labels(labels, [("le", "+Inf")])
+                labels_text = _format_labels(labels)
+                lines.append(f"{METRIC_PREFIX}{name}_bucket{le} {count}")
+                lines.append(f"{METRIC_PREFIX}{name}_sum{labels_text} {total}")
+                lines.append(f"{METRIC_PREFIX}{name}_count{labels_text} {count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """모든 지표를 지웁니다."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+registry = MetricsRegistry()
+inc = registry.inc
+set_gauge = registry.set_gauge
+observe = registry.observe
+span = registry.span
+
+
+class StreamMeter:
+    """스트리밍 응답의 첫 청크까지 시간, 초당 청크/문자 수를 측정합니다."""
+
+    def __init__(self, name="generation", **fields):
+        self.name = name
+        self.fields = fields
+        self.chunks = 0
+        self.chars = 0
+        self.first_chunk_seconds = None
+        self._start = time.perf_counter()
+
+    def on_chunk(self, chunk):
+        if self.first_chunk_seconds is None:
+            self.first_chunk_seconds = time.perf_counter() - self._start
+        self.chunks += 1
+        self.chars += len(chunk)
+
+    def finish(self):
+        """측정값을 히스토그램에 기록하고 로그로 남깁니다."""
+        duration = time.perf_counter() - self._start
+        streaming = duration - (self.first_chunk_seconds or 0.0)
+        chunks_per_second = self.chunks / streaming if streaming > 0 else 0.0
+        chars_per_second = self.chars / streaming if streaming > 0 else 0.0
+        if self.first_chunk_seconds is not None:
+            ttfc_name = f"{self.name}_time_to_first_chunk_seconds"
+            observe(ttfc_name, self.first_chunk_seconds)
+        observe(f"{self.name}_seconds", duration)
+        observe(f"{self.name}_chunks_per_second", chunks_per_second, RATE_BUCKETS)
+        observe(f"{self.name}_chars_per_second", chars_per_second, RATE_BUCKETS)
+        inc(f"{self.name}_chars_total", self.chars)
+        record = {
+            "span": self.name,
+            "seconds": round(duration, 4),
+            "time_to_first_chunk": round(self.first_chunk_seconds or 0.0, 4),
+            "chunks": self.chunks,
+            "chars": self.chars,
+            "chunks_per_second": round(chunks_per_second, 1),
+            "chars_per_second": round(chars_per_second, 1),
+        }
+        record.update(self.fields)
+        logger.info(json.dumps(record, ensure_ascii=False, default=str))
+        write_metrics_file()
+
+
+# --- Exporters ---
+METRICS_FILE = os.environ.get("METRICS_FILE")
+METRICS_FILE_INTERVAL = get_env_int("METRICS_FILE_INTERVAL", 5)  # 초
+_last_file_write = 0.0
+_file_lock = threading.Lock()
+
+
+def write_metrics_file(force=False):
+    """METRICS_FILE이 설정되어 있으면 지표를 파일로 씁니다 (기본 5초에 한 번)."""
+    global _last_file_write
+    if not METRICS_FILE:
+        return
+    now = time.monotonic()
+    with _file_lock:
+        if not force and now - _last_file_write < METRICS_FILE_INTERVAL:
+            return
+        _last_file_write = now
+        tmp_path = f"{METRICS_FILE}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(registry.render_prometheus())
+            os.replace(tmp_path, METRICS_FILE)
+        except OSError as e:
+            logger.warning("지표 파일 저장 오류: %s", e)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # 수집 요청마다 로그를 남기지 않음
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """/metrics 경로로 지표를 제공하는 HTTP 서버를 백그라운드 스레드로 시작합니다."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+            logger.info("지표 서버 시작: http://%s:%d/metrics", host, port)
+        return _server
+
+
+def configure_from_env():
+    """환경 변수(LOG_LEVEL, METRICS_PORT)에 따라 로깅과 지표 서버를 설정합니다."""
+    logging.basicConfig(
+        level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    port = get_env_int("METRICS_PORT", 0)
+    if port:
+        try:
+            start_metrics_server(port)
+        except OSError as e:
+            logger.warning("지표 서버를 시작하지 못했습니다: %s", e)
@@ -1,39 +1,57 @@
 import os
-import google.generativeai as genai
-import PyPDF2
 import io
+import logging
 import platform
 import re
+import time
 from typing import Tuple
 
-from docx import Document
-from docx.shared import Pt
-
-from utils import get_api_key
-
-# --- Initialization ---
-API_KEY = get_api_key()
-
-if not API_KEY:
-    raise ValueError("GEMINI_API_KEY가 .env 파일에 설정되지 않았습니다.")
-
-genai.configure(api_key=API_KEY)
-
-# --- Configuration ---
-GENERATION_CONFIG = {
-    "temperature": 0.7,
-    "top_p": 0.95,
-    "top_k": 40,
-    "max_output_tokens": 10000,
-    "response_mime_type": "text/plain",
-}
-
-# --- Model Instantiation ---
-# Using a recommended model, adjust if needed
-llm_model = genai.GenerativeModel(
-    model_name="gemini-1.5-flash",  # or "gemini-pro" if preferred
-    generation_config=GENERATION_CONFIG,
+from xml.sax.saxutils import escape, quoteattr
+
+import metrics
+from cache import ContentCache, cache_dir_for, content_hash
+from compaction import compact_pages
+from document_factory import DocumentFactory
+from extraction import extract_pdf
+from ocr import OCR_VERSION, ocr_available, ocr_languages
+from llm import GENERATION_CONFIG, MODEL_NAME, get_backend  # noqa: F401
+from mdast import (
+    BlockParser,
+    BlockQuote,
+    CodeBlock,
+    Heading,
+    ListBlock,
+    Paragraph,
+    Rule,
+    Table,
+    block_title_text,
+    extract_title,
 )
+from outline import get_template_outline
+from scheduler import get_scheduler
+from sections import Section, section_outline, split_sections
+from singleflight import SingleFlight
+from summarize import SUMMARY_THRESHOLD_CHARS, summarize_text
+from utils import get_docx_template_path, get_env_int
+
+logger = logging.getLogger(__name__)
+
+# LLM 백엔드(Gemini, 가짜, 재생)는 llm.get_backend()로 처음 생성 요청 때 만들어집니다.
+
+# --- Generation Result Cache ---
+# 같은 프롬프트/모델/설정의 요청은 저장된 답변을 스트림으로 재생합니다.
+generation_cache = ContentCache(
+    "generation",
+    max_entries=get_env_int("GENERATION_CACHE_ENTRIES", 256),
+    max_memory_bytes=get_env_int("GENERATION_CACHE_MEMORY_MB", 32) * 1024 * 1024,
+    ttl=get_env_int("GENERATION_CACHE_TTL", 3600),
+    disk_dir=cache_dir_for("generation"),
+    max_disk_bytes=get_env_int("GENERATION_CACHE_DISK_MB", 256) * 1024 * 1024,
+)
+REPLAY_CHUNK_CHARS = 200
+
+# 같은 프롬프트로 동시에 들어온 요청은 하나의 Gemini 스트림을 공유합니다.
+inflight_generations = SingleFlight()
 
 
 # --- Font Path Setup ---
@@ -52,38 +70,207 @@ def get_system_font():
 
 SYSTEM_FONT = get_system_font()
 
+# --- DOCX Base Document ---
+# 스타일을 적용한 기본 문서를 한 번만 만들고, 내보낼 때마다 복제합니다.
+document_factory = DocumentFactory(
+    os.environ.get("DOCX_FONT") or SYSTEM_FONT,
+    template_path=get_docx_template_path(),
+)
+
 # model.py 파일이 위치한 디렉토리를 기준으로 fonts 폴더 경로 설정
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 FONT_ROOT = os.path.join(BASE_DIR, "fonts")
 
+# --- PDF Text Cache ---
+# 추출 로직이 바뀌면 버전을 올려 이전 캐시 항목을 무효화합니다.
+EXTRACTOR_VERSION = "pypdf2-3"
+
+pdf_text_cache = ContentCache(
+    "pdf_text",
+    max_entries=get_env_int("PDF_CACHE_ENTRIES", 64),
+    disk_dir=cache_dir_for("pdf_text"),
+    max_disk_bytes=get_env_int("PDF_CACHE_DISK_MB", 256) * 1024 * 1024,
+)
+
+# 추출 예산 (0이면 제한 없음): 프롬프트에 쓸 수 있는 분량을 넘으면 일찍 멈춥니다.
+PDF_MAX_PAGES = get_env_int("PDF_MAX_PAGES", 0)
+PDF_MAX_CHARS = get_env_int("PDF_MAX_CHARS", 0)
+
+# --- Prompt Compaction ---
+# 반복되는 머리글/바닥글과 공백을 지운 뒤 프롬프트에 넣습니다 (0이면 끔).
+PROMPT_COMPACTION = get_env_int("PROMPT_COMPACTION", 1)
+# 참고 PDF 내용의 토큰 예산 (0이면 제한 없음)
+REFERENCE_TOKEN_BUDGET = get_env_int("REFERENCE_TOKEN_BUDGET", 0)
+# 서식 구성이 충분히 드러나면 서식 전체 텍스트 대신 구성 골격을 프롬프트에 넣습니다 (0이면 끔).
+TEMPLATE_OUTLINE_PROMPT = get_env_int("TEMPLATE_OUTLINE_PROMPT", 1)
+
 
 # --- Core Logic Functions ---
-def extract_text_from_pdf(uploaded_pdf_file):
-    """PDF 파일 객체에서 텍스트를 추출합니다."""
-    text = ""
+def extract_pages_from_pdf(uploaded_pdf_file, max_pages=None, max_chars=None):
+    """PDF 파일 객체에서 페이지별 텍스트 목록을 추출합니다.
+
+    같은 내용의 PDF는 SHA-256 해시로 캐시되어 다시 파싱하지 않습니다.
+    텍스트가 없는 페이지도 빈 문자열로 포함되며, 오류 시 None을 반환합니다.
+    """
     if uploaded_pdf_file is None:
         return None
+    if max_pages is None:
+        max_pages = PDF_MAX_PAGES
+    if max_chars is None:
+        max_chars = PDF_MAX_CHARS
+    file_name = getattr(uploaded_pdf_file, "name", "")
+    with metrics.span("pdf_extraction", file=file_name) as span:
+        try:
+            # Reset buffer position for reading
+            uploaded_pdf_file.seek(0)
+            pdf_bytes = uploaded_pdf_file.read()
+        except Exception as e:
+            logger.warning("PDF 파일 읽기 오류: %s", e)
+            span["failed"] = True
+            return None
+
+        span["bytes"] = len(pdf_bytes)
+        # OCR을 쓸 수 있게 되면 이전의 (텍스트 없는) 캐시 항목을 쓰지 않습니다.
+        ocr_identity = OCR_VERSION + ocr_languages() if ocr_available() else ""
+        cache_key = content_hash(
+            EXTRACTOR_VERSION,
+            ocr_identity,
+            str(max_pages or 0),
+            str(max_chars or 0),
+            pdf_bytes,
+        )
+        pages = pdf_text_cache.get(cache_key)
+        span["cache_hit"] = pages is not None
+        if pages is None:
+            pages = _extract_and_cache(pdf_bytes, cache_key, max_pages, max_chars)
+            if pages is None:
+                span["failed"] = True
+                return None
+
+        chars = sum(len(page) for page in pages)
+        span["pages"] = len(pages)
+        span["chars"] = chars
+        metrics.inc("pdf_pages_total", len(pages))
+        metrics.observe("pdf_chars", chars, metrics.SIZE_BUCKETS)
+    return pages
+
+
+def _extract_and_cache(pdf_bytes, cache_key, max_pages, max_chars):
     try:
-        # Reset buffer position for reading
-        uploaded_pdf_file.seek(0)
-        pdf_reader = PyPDF2.PdfReader(uploaded_pdf_file)
-        for page in pdf_reader.pages:
-            try:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text
-            except Exception:
-                # Log or handle page-specific extraction errors if needed
-                continue  # Continue to next page even if one fails
-        return text if text else None  # Return None if no text extracted
+        result = extract_pdf(
+            pdf_bytes, max_pages=max_pages, max_chars=max_chars, ocr=True
+        )
     except Exception as e:
-        print(f"PDF 텍스트 추출 오류: {e}")  # Log error
+        logger.warning("PDF 텍스트 추출 오류: %s", e)
         return None  # Return None on error
 
+    for index, error in result.failed_pages:
+        # 실패한 페이지는 빈 문자열로 남김
+        logger.warning("PDF %d쪽 텍스트 추출 오류: %s", index + 1, error)
+    metrics.inc("pdf_failed_pages_total", len(result.failed_pages))
+    if result.truncated:
+        logger.info(
+            "PDF 추출 예산 도달: 전체 %d쪽 중 %d쪽만 사용합니다.",
+            result.total_pages,
+            len(result.pages),
+        )
+
+    if result.ocr_incomplete:
+        # OCR하지 못한 페이지(시간 초과, 오류)가 있으면 문서 단위로는 캐시하지 않습니다.
+        # 끝난 페이지는 페이지 캐시에 남아 다음 업로드 때 이어서 처리됩니다.
+        return result.pages
+    pdf_text_cache.put(cache_key, result.pages)
+    return result.pages
+
+
+def extract_text_from_pdf(uploaded_pdf_file, max_pages=None, max_chars=None):
+    """PDF 파일 객체에서 텍스트를 추출합니다."""
+    pages = extract_pages_from_pdf(uploaded_pdf_file, max_pages, max_chars)
+    if pages is None:
+        return None  # Return None on error
+    text = "".join(pages)
+    return text if text else None  # Return None if no text extracted
 
-def generate_content_from_gemini(template_text, reference_text, instructions):
-    """Gemini 모델을 사용하여 콘텐츠 생성을 스트리밍 방식으로 처리합니다."""
-    prompt_text = f"""
+
+def extract_prompt_text(uploaded_pdf_file, source="template", token_budget=0):
+    """PDF에서 추출한 텍스트를 프롬프트용으로 압축해 반환합니다.
+
+    원래 글자 수와 압축 후 글자 수는 `compaction` 구간 로그와 지표로 남습니다.
+    """
+    pages = extract_pages_from_pdf(uploaded_pdf_file)
+    if pages is None:
+        return None  # Return None on error
+    return _compact_for_prompt(pages, source, token_budget)
+
+
+def extract_template(uploaded_pdf_file):
+    """서식 PDF에서 (프롬프트용 텍스트, TemplateOutline)을 추출합니다.
+
+    서식 구성은 같은 내용의 서식마다 한 번만 분석해 색인에 보관합니다.
+    추출에 실패하면 (None, None)을 반환합니다.
+    """
+    pages = extract_pages_from_pdf(uploaded_pdf_file)
+    if pages is None:
+        return None, None  # Return None on error
+    outline = get_template_outline(pages)
+    return _compact_for_prompt(pages, "template", 0), outline
+
+
+def _compact_for_prompt(pages, source, token_budget):
+    if not PROMPT_COMPACTION:
+        return "".join(pages) or None
+
+    with metrics.span("compaction", source=source) as span:
+        result = compact_pages(pages, token_budget)
+        span["original_chars"] = result.original_chars
+        span["compacted_chars"] = result.compacted_chars
+        span["removed_lines"] = result.removed_lines
+        span["truncated"] = result.truncated
+    saved = max(0, result.original_chars - result.compacted_chars)
+    metrics.inc("prompt_compaction_chars_saved_total", saved, source=source)
+    return result.text or None  # Return None if no text extracted
+
+
+def needs_reference_summary(reference_text):
+    """참고 텍스트가 요약 기준(REFERENCE_SUMMARY_THRESHOLD)을 넘는지 확인합니다."""
+    return bool(
+        SUMMARY_THRESHOLD_CHARS
+        and reference_text
+        and len(reference_text) > SUMMARY_THRESHOLD_CHARS
+    )
+
+
+def condense_reference(reference_text, session_id=None):
+    """긴 참고 텍스트를 조각별 요약으로 줄여 반환합니다. 기준 이하면 그대로 반환합니다."""
+    if not needs_reference_summary(reference_text):
+        return reference_text
+    with metrics.span("reference_summary") as span:
+        digest = summarize_text(reference_text, session_id=session_id)
+        span["original_chars"] = len(reference_text)
+        span["digest_chars"] = len(digest)
+    return digest
+
+
+def use_outline(outline):
+    """프롬프트에 서식 전체 텍스트 대신 구성 골격을 넣을지 정합니다."""
+    return bool(TEMPLATE_OUTLINE_PROMPT and outline is not None and outline.is_useful())
+
+
+def build_prompt(template_text, reference_text, instructions, outline=None):
+    """서식/참고 PDF 텍스트와 지시사항으로 Gemini 프롬프트를 만듭니다.
+
+    `outline`(TemplateOutline)의 구성이 충분하면 서식 전체 텍스트 대신 골격을 넣습니다.
+    """
+    if use_outline(outline):
+        prompt_text = f"""
+# 계획서 또는 보고서 작성
+
+## PDF 서식 구성 (제목, 입력 항목, 표 머리글):
+{outline.skeleton}
+
+"""
+    else:
+        prompt_text = f"""
 # 계획서 또는 보고서 작성
 
 ## PDF 서식 파일 내용:
@@ -110,171 +297,409 @@ def generate_content_from_gemini(template_text, reference_text, instructions):
 **학교 사업 계획서, 교육 활동 계획서, 프로젝트 학습 계획서 등 교육 관련 계획서 및 보고서 작성에 특화되어 있습니다.**
 **표(테이블)가 필요한 경우 마크다운 테이블 형식으로 생성해주세요.**
 """
+    if use_outline(outline):
+        prompt_text += """**서식 구성의 제목 순서와 수준(#의 개수), 표의 열 구성을 그대로 따라 작성하세요.**
+"""
+    return prompt_text
+
+
+def generation_cache_key(prompt_text, backend=None):
+    """프롬프트와 백엔드 식별 정보(모델 이름, 생성 설정)로 결과 캐시 키를 만듭니다."""
+    backend = backend or get_backend()
+    return content_hash(prompt_text, backend.name, backend.cache_identity())
+
+
+def replay_cached_response(text, chunk_chars=REPLAY_CHUNK_CHARS):
+    """캐시된 답변을 스트리밍 응답과 같은 방식으로 청크 단위로 반환합니다."""
+    for start in range(0, len(text), chunk_chars):
+        yield text[start : start + chunk_chars]
+
+
+def _prepare_prompt(template_text, reference_text, instructions, outline=None):
+    with metrics.span("prompt_build") as span:
+        prompt_text = build_prompt(template_text, reference_text, instructions, outline)
+        span["prompt_chars"] = len(prompt_text)
+        span["template_outline"] = use_outline(outline)
+    metrics.observe("prompt_chars", len(prompt_text), metrics.SIZE_BUCKETS)
+    return prompt_text
+
+
+# 생성 결과에 이 문구가 있으면 실패한 생성으로 봅니다 (화면, 배치 공통).
+ERROR_MARKER = "오류 발생:"
+
+
+def generation_error_message(error):
+    """생성 실패 시 결과 끝에 붙이는 안내 문구."""
+    logger.error("Gemini API 호출 오류: %s", error)
+    metrics.inc("generation_errors_total")
+    return f"\n\n{ERROR_MARKER} 콘텐츠 생성 중 문제가 발생했습니다. ({error})"
+
+
+def generate_content_from_gemini(
+    template_text, reference_text, instructions, session_id=None, outline=None
+):
+    """Gemini 모델을 사용하여 콘텐츠 생성을 스트리밍 방식으로 처리합니다."""
+    prompt_text = _prepare_prompt(
+        template_text, reference_text, instructions, outline
+    )
+    yield from stream_prompt(prompt_text, session_id)
+
+
+def stream_prompt(prompt_text, session_id=None):
+    """프롬프트 하나의 답변을 스트리밍합니다.
+
+    같은 요청의 답변이 캐시에 있으면 API를 호출하지 않고 재생하고,
+    같은 요청이 이미 진행 중이면 그 스트림을 함께 받습니다.
+    API 호출은 공유 스케줄러의 요청/토큰 한도와 세션별 대기열을 거칩니다.
+    """
+    cache_key = generation_cache_key(prompt_text)
+    cached_response = generation_cache.get(cache_key)
+    if cached_response is not None:
+        metrics.inc("generation_requests_total", source="cache")
+        yield from replay_cached_response(cached_response)
+        return
+
+    metrics.inc("generation_requests_total", source="model")
+
+    yield from inflight_generations.stream(
+        cache_key, lambda: _stream_from_gemini(prompt_text, cache_key, session_id)
+    )
+
+
+def _stream_from_gemini(prompt_text, cache_key, session_id=None):
+    """Gemini 스트리밍 호출을 수행하고 정상 완료된 답변을 캐시에 저장합니다."""
+    chunks = []
     try:
-        # stream=True로 설정하여 응답을 청크 단위로 받음
-        response_stream = llm_model.generate_content([prompt_text], stream=True)
-        for chunk in response_stream:
-            # Check if the chunk has text content and it's not empty
-            if hasattr(chunk, "text") and chunk.text:
-                yield chunk.text  # 각 텍스트 청크를 반환 (yield)
+        for text in get_scheduler().stream(get_backend(), prompt_text, session_id):
+            chunks.append(text)
+            yield text  # 각 텍스트 청크를 반환 (yield)
     except Exception as e:
-        print(f"Gemini API 호출 오류: {e}")  # Log error
-        yield f"\n\n오류 발생: 콘텐츠 생성 중 문제가 발생했습니다. ({e})"  # Yield error message
-
-
-def markdown_to_docx(markdown_text: str) -> Tuple[str, io.BytesIO]:
-    """마크다운 텍스트를 docx 문서로 변환하여 BytesIO로 반환합니다."""
-    doc = Document()
-
-    # 기본 스타일 설정
-    style = doc.styles["Normal"]
-    font = style.font
-    font.name = "Malgun Gothic"  # 시스템에 맞게 조정 가능
-    font.size = Pt(11)
-
-    lines = markdown_text.strip().splitlines()
-    table_mode = False
-    table_rows = []
-    tables = []
-    title = ""
-
-    def parse_inline_styles(paragraph, text):
-        """텍스트 내 인라인 스타일 처리: **bold**, *italic*, ***both***"""
-        pattern = r"(\*\*\*.*?\*\*\*|\*\*.*?\*\*|\*.*?\*)"
-        parts = re.split(pattern, text)
-        for part in parts:
-            run = paragraph.add_run(re.sub(r"[*]", "", part))  # 기본 텍스트
-            if part.startswith("***") and part.endswith("***"):
-                run.bold = True
-                run.italic = True
-            elif part.startswith("**") and part.endswith("**"):
-                run.bold = True
-            elif part.startswith("*") and part.endswith("*"):
-                run.italic = True
-
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        if not line:
-            i += 1
-            continue
+        yield generation_error_message(e)  # Yield error message
+        return
+
+    # 끝까지 정상적으로 받은 답변만 캐시합니다.
+    if chunks:
+        generation_cache.put(cache_key, "".join(chunks))
+
+
+# --- Section Regeneration ---
+SECTION_CONTEXT_CHARS = get_env_int("SECTION_CONTEXT_CHARS", 1500)
+
+
+def build_section_prompt(outline, sections, index, instructions, section_instructions):
+    """한 부분만 다시 작성하기 위한 프롬프트를 만듭니다.
+
+    전체 문서 대신 서식 구성 골격(`outline`, TemplateOutline), 문서의 부분 제목 목록,
+    앞뒤 부분의 일부만 보냅니다.
+    """
+    target = sections[index]
+    previous_text = sections[index - 1].markdown if index > 0 else ""
+    next_text = sections[index + 1].markdown if index + 1 < len(sections) else ""
+    prompt_text = f"""
+# 계획서 또는 보고서의 한 부분 다시 작성
+
+## PDF 서식 구성:
+{(outline.skeleton if outline else "") or "(없음)"}
+
+## 현재 문서의 구성:
+{section_outline(sections, marked_index=index)}
 
-        # 제목
-        if line.startswith("#"):
-            level = min(line.count("#"), 4)
-            text = line.lstrip("#").strip()
-            doc.add_heading(text, level=level)
-            table_mode = False
-
-        # 리스트
-        elif line.startswith(("- ", "* ")):
-            doc.add_paragraph(line[2:].strip(), style="List Bullet")
-            table_mode = False
-
-        elif re.match(r"^\d+\.\s", line):
-            doc.add_paragraph(re.sub(r"^\d+\.\s", "", line), style="List Number")
-            table_mode = False
-
-        # 테이블 감지
-        elif "|" in line:
-            row = [cell.strip() for cell in line.split("|") if cell.strip()]
-            table_rows.append(row)
-
-            # 다음 줄이 헤더 구분줄(---)인지 확인
-            if i + 1 < len(lines):
-                next_line = lines[i + 1].strip()
-                if re.match(r"^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)+\|?\s*$", next_line):
-                    i += 1  # 구분선은 건너뛰기
-                    table_rows.append("__HEADER__")  # 마커로 표시
-
-        else:
-            # 이전 테이블 처리
-            if table_rows:
-                header_style = []
-                if "__HEADER__" in table_rows:
-                    header_index = table_rows.index("__HEADER__")
-                    headers = table_rows[header_index - 1]
-                    data_rows = table_rows[header_index + 1 :]
-                    all_rows = [headers] + data_rows
-                    header_style = [True] + [False] * len(data_rows)
+## 원래 작성 지시사항:
+{instructions}
+
+## 바로 앞 부분 (끝부분):
+{previous_text[-SECTION_CONTEXT_CHARS:] or "(없음)"}
+
+## 다시 작성할 부분:
+{target.markdown}
+
+## 바로 뒤 부분 (앞부분):
+{next_text[:SECTION_CONTEXT_CHARS] or "(없음)"}
+
+## 수정 요청:
+{section_instructions or "내용을 더 구체적이고 완성도 있게 다시 작성해주세요."}
+
+---
+
+**'다시 작성할 부분'만 수정 요청에 맞게 새로 작성하세요. 다른 부분은 출력하지 마세요.**
+**원래 부분과 같은 제목 줄로 시작하고, 앞뒤 부분과 내용이 자연스럽게 이어지게 작성하세요.**
+**한국어로 작성하며, 표(테이블)가 필요한 경우 마크다운 테이블 형식으로 생성해주세요.**
+"""
+    return prompt_text
+
+
+def regenerate_section(
+    outline, sections, index, instructions, section_instructions, session_id=None
+):
+    """한 부분의 새 마크다운을 스트리밍합니다."""
+    with metrics.span("prompt_build", kind="section") as span:
+        prompt_text = build_section_prompt(
+            outline, sections, index, instructions, section_instructions
+        )
+        span["prompt_chars"] = len(prompt_text)
+    metrics.inc("section_regenerations_total")
+    yield from stream_prompt(prompt_text, session_id)
+
+
+def section_from_builder(markdown_text, builder):
+    """한 부분의 마크다운을 받은 DocxStreamBuilder를 마무리해 Section으로 만듭니다."""
+    builder.close()
+    heading = next(
+        (block_title_text(b) for b in builder.blocks if isinstance(b, Heading)), ""
+    )
+    section = Section(heading, markdown_text, builder.blocks)
+    section.fragments = [xml for block_xml in builder.fragments() for xml in block_xml]
+    return section
+
+
+def render_section(markdown_text, outline=None):
+    """마크다운 한 부분을 HTML과 DOCX 조각까지 렌더링한 Section으로 만듭니다."""
+    builder = DocxStreamBuilder(outline)
+    builder.feed(markdown_text)
+    return section_from_builder(markdown_text, builder)
+
+
+def replace_section(sections, index, new_section, outline=None):
+    """`index`번째 부분을 `new_section`으로 바꾼 새 목록을 반환합니다.
+
+    나머지 부분의 렌더링 결과는 그대로 씁니다.
+    답변에 제목 줄이 빠졌으면 원래 제목 줄을 붙여 다시 렌더링합니다.
+    """
+    old = sections[index]
+    first_heading = next((b for b in old.blocks if isinstance(b, Heading)), None)
+    if first_heading is not None and not any(
+        isinstance(block, Heading) for block in new_section.blocks
+    ):
+        heading_line = "#" * first_heading.level + " " + first_heading.text
+        new_section = render_section(
+            f"{heading_line}\n\n{new_section.markdown.lstrip()}", outline
+        )
+    return sections[:index] + [new_section] + sections[index + 1 :]
+
+
+def sections_from_builder(markdown_text, builder):
+    """생성을 마친 DocxStreamBuilder의 결과를 Section 목록으로 나눕니다.
+
+    스트리밍 중 파싱한 블록과 줄 범위로 나누고, 만든 DOCX 요소를 부분별로 나누어
+    보관하므로 다시 파싱하거나 렌더링하지 않습니다. `markdown_text`는 빌더에 넣은
+    텍스트 전체여야 합니다.
+    """
+    sections = split_sections(markdown_text, builder.blocks, builder.spans)
+    fragments = builder.fragments()
+    position = 0
+    for section in sections:
+        count = len(section.blocks)
+        section.fragments = [
+            xml
+            for block_xml in fragments[position : position + count]
+            for xml in block_xml
+        ]
+        position += count
+    return sections
+
+
+def assemble_docx(sections):
+    """부분별 DOCX 조각을 기본 문서에 이어 붙여 (제목, BytesIO)를 반환합니다."""
+    from docx.oxml import parse_xml
+
+    with metrics.span("docx_assemble", sections=len(sections)):
+        doc = document_factory.new_document()
+        body = doc.element.body
+        sect_pr = body.sectPr
+        for section in sections:
+            for xml in section.fragments:
+                element = parse_xml(xml)
+                if sect_pr is not None:
+                    sect_pr.addprevious(element)
                 else:
-                    all_rows = table_rows
-                    header_style = [False] * len(all_rows)
-
-                num_rows = len(all_rows)
-                num_cols = max(len(row) for row in all_rows)
-                table = doc.add_table(rows=num_rows, cols=num_cols)
-                table.style = "Table Grid"
-
-                for r, row in enumerate(all_rows):
-                    for c, cell in enumerate(row):
-                        cell_text = cell
-                        cell_obj = table.cell(r, c)
-                        cell_obj.text = cell_text
-                        for run in cell_obj.paragraphs[0].runs:
-                            run.font.name = "Malgun Gothic"
-                            if header_style[r]:
-                                run.bold = True
-                table_rows = []
-
-            # 일반 문단
-            p = doc.add_paragraph()
-            parse_inline_styles(p, line)
-
-        if not title:
-            title = get_title(line)
-        i += 1
-
-    # 혹시 마지막 줄이 테이블이면 처리
-    if table_rows:
-        all_rows = table_rows
-        num_rows = len(all_rows)
-        num_cols = max(len(row) for row in all_rows)
-        table = doc.add_table(rows=num_rows, cols=num_cols)
-        table.style = "Table Grid"
-        for r, row in enumerate(all_rows):
-            for c, cell in enumerate(row):
-                cell_obj = table.cell(r, c)
-                cell_obj.text = cell
-                for run in cell_obj.paragraphs[0].runs:
-                    run.font.name = "Malgun Gothic"
-
-    # 결과 저장
-    buffer = io.BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
-    return (title, buffer)
-
-
-def get_title(line):
-    match = re.match(r"^#+\s*(.*)", line)  # Heading tag
-    if match:
-        return match.group(1).strip()
-
-    match = re.match(r"^-+\s*(.*)", line)  # Unordered list tag
-    if match:
-        return match.group(1).strip()
-
-    match = re.match(r"^\d+\.\s*(.*)", line)  # Ordered list tag
-    if match:
-        return match.group(1).strip()
-
-    match = re.match(r"^>\s*(.*)", line)  # Blockquote tag
-    if match:
-        return match.group(1).strip()
-
-    match = re.match(r"^`{3}.*", line)  # Code block start
-    if match:
-        return ""  # Code block 시작 줄은 텍스트로 간주하지 않음
-
-    match = re.match(r"^\|.*\|$", line)  # Table row
-    if match:
-        # 테이블 행 내부의 텍스트를 추출 (간단하게 처리)
-        cells = [cell.strip() for cell in line.strip("|").split("|")]
-        return " ".join(cells)
-
-    match = re.match(r"^[*_]{1,3}(.*?)[*_]{1,3}$", line)  # Bold, italic
-    if match:
-        return match.group(1).strip()
-
-    return line.strip()
+                    body.append(element)
+        title = extract_title([b for section in sections for b in section.blocks])
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        buffer.seek(0)
+    return title, buffer
+
+
+def markdown_to_docx(markdown_text: str, outline=None) -> Tuple[str, io.BytesIO]:
+    """마크다운 텍스트를 docx 문서로 변환하여 BytesIO로 반환합니다.
+
+    `outline`(TemplateOutline)이 있으면 제목 수준과 표의 열 구성을 서식에 맞춥니다.
+    """
+    builder = DocxStreamBuilder(outline)
+    builder.feed(markdown_text)
+    return builder.finish()
+
+
+# --- Inline Patterns ---
+INLINE_STYLE_RE = re.compile(r"(\*\*\*.*?\*\*\*|\*\*.*?\*\*|\*.*?\*)")
+ASTERISK_RE = re.compile(r"[*]")
+
+CODE_FONT = "Consolas"
+
+
+def parse_inline_styles(paragraph, text):
+    """텍스트 내 인라인 스타일 처리: **bold**, *italic*, ***both***"""
+    parts = INLINE_STYLE_RE.split(text)
+    for part in parts:
+        run = paragraph.add_run(ASTERISK_RE.sub("", part))  # 기본 텍스트
+        if part.startswith("***") and part.endswith("***"):
+            run.bold = True
+            run.italic = True
+        elif part.startswith("**") and part.endswith("**"):
+            run.bold = True
+        elif part.startswith("*") and part.endswith("*"):
+            run.italic = True
+
+
+def render_docx_block(doc, block):
+    """블록 노드 하나를 docx 문서에 추가합니다."""
+    if isinstance(block, Heading):
+        heading = doc.add_heading("", level=min(block.level, 4))
+        parse_inline_styles(heading, block.text)
+    elif isinstance(block, Paragraph):
+        for line in block.lines:
+            parse_inline_styles(doc.add_paragraph(), line)
+    elif isinstance(block, ListBlock):
+        for item, level, ordered in zip(block.items, block.levels, block.ordered_items):
+            style = document_factory.list_style(ordered, level)
+            parse_inline_styles(doc.add_paragraph(style=style), item)
+    elif isinstance(block, Table):
+        rows = ([block.header] if block.header else []) + block.rows
+        header_style = [bool(block.header)] + [False] * (len(rows) - 1)
+        num_cols = max((len(row) for row in rows), default=0)
+        add_table_bulk(
+            doc, rows, header_style, num_cols, font_name=document_factory.table_font
+        )
+    elif isinstance(block, CodeBlock):
+        run = doc.add_paragraph().add_run(block.text)
+        run.font.name = CODE_FONT
+    elif isinstance(block, BlockQuote):
+        for line in block.lines:
+            parse_inline_styles(doc.add_paragraph(style="Quote"), line)
+    elif isinstance(block, Rule):
+        doc.add_paragraph()
+
+
+class DocxStreamBuilder:
+    """스트리밍 청크를 받는 대로 완성된 마크다운 블록을 docx 문서에 추가합니다.
+
+    청크는 `mdast.BlockParser`로 한 번만 파싱되며, 블록이 완성되는 즉시(표는 마지막
+    행 다음 줄이 오면) 문서에 반영됩니다. 파싱된 블록은 `blocks`에 남아 HTML 미리보기와
+    제목 추출에 그대로 재사용됩니다. 마지막 청크 후 `finish()`를 호출하면
+    (제목, BytesIO)를 반환합니다. `outline`(TemplateOutline)이 있으면 블록을 서식에
+    맞춘 뒤(제목 수준, 표의 열) 문서에 추가하고 `blocks`에 보관합니다.
+    """
+
+    def __init__(self, outline=None):
+        start = time.perf_counter()
+        self.outline = outline
+        self.doc = document_factory.new_document()
+        self.blocks = []
+        self.block_sizes = []  # 블록마다 추가된 본문 요소 수
+        self.title = ""
+        self._parser = BlockParser()
+        self.spans = self._parser.spans  # 블록마다 원문 줄 범위
+        self.build_time = time.perf_counter() - start  # 변환에 쓴 누적 시간(초)
+
+    def feed(self, chunk):
+        """청크를 추가하고, 완성된 블록을 문서에 반영합니다."""
+        start = time.perf_counter()
+        self._add_blocks(self._parser.feed(chunk))
+        self.build_time += time.perf_counter() - start
+
+    def close(self):
+        """남은 블록을 마무리합니다."""
+        start = time.perf_counter()
+        self._add_blocks(self._parser.close())
+        self.title = extract_title(self.blocks)
+        self.build_time += time.perf_counter() - start
+
+    def finish(self) -> Tuple[str, io.BytesIO]:
+        """남은 블록을 마무리하고 docx 문서를 BytesIO로 저장하여 반환합니다."""
+        self.close()
+        start = time.perf_counter()
+
+        # 결과 저장
+        buffer = io.BytesIO()
+        self.doc.save(buffer)
+        buffer.seek(0)
+        self.build_time += time.perf_counter() - start
+        return (self.title, buffer)
+
+    def fragments(self):
+        """블록마다 추가된 본문 요소를 XML 문자열 목록으로 반환합니다."""
+        from lxml import etree
+
+        elements = iter(self.doc.element.body)
+        return [
+            [etree.tostring(next(elements), encoding="unicode") for _ in range(size)]
+            for size in self.block_sizes
+        ]
+
+    def _add_blocks(self, blocks):
+        if self.outline is not None:
+            # HTML 미리보기도 `blocks`를 쓰므로 서식에 맞춘 블록을 보관합니다.
+            blocks = [self.outline.conform_block(block) for block in blocks]
+        body = self.doc.element.body
+        for block in blocks:
+            before = len(body)
+            render_docx_block(self.doc, block)
+            self.block_sizes.append(len(body) - before)
+        self.blocks.extend(blocks)
+
+
+def add_table_bulk(doc, rows, header_style, num_cols, font_name=None):
+    """표 전체를 한 번에 XML로 만들어 문서에 추가합니다.
+
+    `table.cell(r, c)`는 호출할 때마다 전체 셀 목록을 다시 계산하므로 행이 많은 표에서
+    느립니다. 대신 모든 행을 하나의 XML 문자열로 만들어 한 번에 파싱합니다.
+    셀 구조는 `cell.text`로 채운 뒤 run 서식을 지정한 것과 같습니다.
+    `font_name`이 None이면 셀 글꼴은 표 스타일을 따릅니다.
+    """
+    from docx.oxml import parse_xml
+    from docx.oxml.ns import nsdecls
+
+    table = doc.add_table(rows=0, cols=num_cols)
+    table.style = "Table Grid"
+    if not rows:
+        return table
+
+    col_width = table.columns[0].width.twips if num_cols else 0
+    r_fonts = ""
+    if font_name:
+        font_attr = quoteattr(font_name)
+        r_fonts = (
+            f"<w:rFonts w:ascii={font_attr} w:hAnsi={font_attr}"
+            f" w:eastAsia={font_attr}/>"
+        )
+    empty_tc = (
+        f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{col_width}"/></w:tcPr><w:p/></w:tc>'
+    )
+    parts = []
+    for row, is_header in zip(rows, header_style):
+        r_pr = f"<w:rPr>{r_fonts}{'<w:b/>' if is_header else ''}</w:rPr>"
+        parts.append("<w:tr>")
+        for cell in row:
+            parts.append(
+                f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{col_width}"/></w:tcPr>'
+                f"<w:p><w:r>{r_pr}{_run_text_xml(cell)}</w:r></w:p></w:tc>"
+            )
+        parts.append(empty_tc * (num_cols - len(row)))
+        parts.append("</w:tr>")
+
+    rows_xml = parse_xml(f"<w:tbl {nsdecls('w')}>{''.join(parts)}</w:tbl>")
+    table._tbl.extend(list(rows_xml))
+    return table
+
+
+def _run_text_xml(text):
+    # python-docx의 run.text와 같이 탭은 <w:tab/>으로 바꿉니다.
+    pieces = []
+    for i, piece in enumerate(text.split("\t")):
+        if i:
+            pieces.append("<w:tab/>")
+        if not piece:
+            continue
+        space = ' xml:space="preserve"' if piece != piece.strip() else ""
+        pieces.append(f"<w:t{space}>{escape(piece)}</w:t>")
+    return "".join(pieces)
@@ -0,0 +1,284 @@
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import metrics
+from cache import ContentCache, cache_dir_for, content_hash
+from utils import get_env_int
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+OCR_ENABLED = get_env_int("OCR_ENABLED", 1)
+OCR_LANG = os.environ.get("OCR_LANG", "kor+eng")
+OCR_DPI = get_env_int("OCR_DPI", 300)
+# 문서 하나의 OCR에 쓸 수 있는 최대 시간(초). 넘으면 끝난 페이지까지만 사용합니다.
+OCR_TIME_BUDGET = get_env_int("OCR_TIME_BUDGET", 60)
+# 공백을 뺀 글자 수가 이보다 적은 페이지는 텍스트 층이 없는 것으로 봅니다.
+OCR_MIN_CHARS = get_env_int("OCR_MIN_CHARS", 5)
+# 동시에 OCR하는 페이지 수 (프로세스 전체). PDF 텍스트 추출 풀과는 따로 둡니다.
+OCR_WORKERS = get_env_int("OCR_WORKERS", min(2, os.cpu_count() or 1))
+# 엔진이나 옵션이 바뀌면 버전을 올려 이전 캐시 항목을 무효화합니다.
+OCR_VERSION = "tesseract-1"
+
+ocr_cache = ContentCache(
+    "ocr_page",
+    max_entries=get_env_int("OCR_CACHE_ENTRIES", 1024),
+    disk_dir=cache_dir_for("ocr_page"),
+    max_disk_bytes=get_env_int("OCR_CACHE_DISK_MB", 64) * 1024 * 1024,
+)
+
+_languages = None
+_languages_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_ocr_pool():
+    """OCR용 스레드 풀을 반환합니다. 처음 호출할 때 생성합니다.
+
+    실제 작업은 pdftoppm/tesseract 하위 프로세스가 하므로 스레드로 충분하며,
+    스캔 문서가 PDF 텍스트 추출 풀을 오래 차지하지 않도록 따로 둡니다.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, OCR_WORKERS), thread_name_prefix="ocr"
+            )
+        return _executor
+
+
+def ocr_languages():
+    """설치된 Tesseract 언어 데이터 중 OCR_LANG에 있는 언어를 "+"로 이어 반환합니다.
+
+    pdftoppm이나 tesseract가 없거나 쓸 수 있는 언어가 없으면 빈 문자열.
+    """
+    global _languages
+    with _languages_lock:
+        if _languages is None:
+            _languages = _detect_languages()
+        return _languages
+
+
+def _detect_languages():
+    if not (shutil.which("pdftoppm") and shutil.which("tesseract")):
+        logger.info("pdftoppm/tesseract가 없어 OCR을 사용하지 않습니다.")
+        return ""
+    try:
+        output = subprocess.run(
+            ["tesseract", "--list-langs"],
+            capture_output=True,
+            text=True,
+            timeout=10,
+        ).stdout
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning("Tesseract 언어 목록 확인 오류: %s", e)
+        return ""
+    installed = set(output.split())
+    wanted = [lang for lang in OCR_LANG.split("+") if lang]
+    available = [lang for lang in wanted if lang in installed]
+    missing = set(wanted) - set(available)
+    if missing:
+        logger.warning(
+            "Tesseract 언어 데이터가 없습니다: %s", ", ".join(sorted(missing))
+        )
+    return "+".join(available)
+
+
+def ocr_available():
+    return bool(OCR_ENABLED) and bool(ocr_languages())
+
+
+def needs_ocr(text):
+    """텍스트 층이 없는(스캔 이미지) 페이지인지 확인합니다."""
+    return len("".join(text.split())) < OCR_MIN_CHARS
+
+
+def page_fingerprint(page):
+    """페이지 내용 스트림과 이미지 데이터로 페이지 캐시 키를 만듭니다.
+
+    같은 스캔 페이지는 다른 PDF에 들어 있어도 같은 키가 됩니다.
+    """
+    parts = [OCR_VERSION, ocr_languages(), str(OCR_DPI), str(page.mediabox)]
+    contents = page.get_contents()
+    if contents is not None:
+        parts.append(contents.get_data())
+    resources = page.get("/Resources")
+    xobjects = resources.get_object().get("/XObject") if resources else None
+    if xobjects:
+        xobjects = xobjects.get_object()
+        for name in sorted(xobjects):
+            xobject = xobjects[name].get_object()
+            # 이미지는 압축을 풀지 않고 원래 스트림 그대로 해시합니다.
+            parts.append(name)
+            parts.append(getattr(xobject, "_data", b"") or b"")
+    return content_hash(*parts)
+
+
+def _remaining(deadline):
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise TimeoutError("OCR 시간 예산 초과")
+    return remaining
+
+
+def _ocr_page(pdf_path, index, languages, dpi, deadline):
+    """OCR 풀에서 한 페이지를 이미지로 변환해 OCR한 텍스트를 반환합니다.
+
+    `deadline`은 time.time() 기준 시각이며, 지나면 TimeoutError를 냅니다.
+    """
+    # 여러 페이지를 동시에 처리하므로 tesseract 내부 스레드는 하나만 씁니다.
+    env = dict(os.environ, OMP_THREAD_LIMIT="1")
+    with tempfile.TemporaryDirectory(prefix="docx-ai-ocr-") as work_dir:
+        image_root = os.path.join(work_dir, "page")
+        subprocess.run(
+            [
+                "pdftoppm",
+                "-f",
+                str(index + 1),
+                "-l",
+                str(index + 1),
+                "-r",
+                str(dpi),
+                "-gray",
+                "-png",
+                "-singlefile",
+                pdf_path,
+                image_root,
+            ],
+            check=True,
+            capture_output=True,
+            timeout=_remaining(deadline),
+        )
+        result = subprocess.run(
+            ["tesseract", image_root + ".png", "stdout", "-l", languages],
+            check=True,
+            capture_output=True,
+            env=env,
+            timeout=_remaining(deadline),
+        )
+    return result.stdout.decode("utf-8", errors="replace")
+
+
+def ocr_pages(reader, pdf_bytes, pages, executor=None, time_budget=OCR_TIME_BUDGET):
+    """텍스트 층이 없거나 추출에 실패한 페이지만 OCR해 채운 PageText 목록을 반환합니다.
+
+    페이지별 결과는 페이지 해시로 캐시합니다. `executor`를 주지 않으면 OCR 풀을
+    쓰며, 문서 하나가 풀을 모두 차지하지 않도록 한 번에 OCR_WORKERS쪽까지만
+    맡깁니다. `time_budget`초가 지나면 남은 작업을 취소하고, 그때까지 끝난 페이지만
+    채워 (페이지 목록, 미완료 여부)를 반환합니다. 시간 초과나 오류로 OCR 텍스트를
+    얻지 못한 페이지가 하나라도 있으면 미완료입니다.
+    """
+    targets = [
+        position
+        for position, page in enumerate(pages)
+        if page.error is not None or needs_ocr(page.text)
+    ]
+    if not targets or not ocr_available():
+        return pages, False
+
+    pages = list(pages)
+    with metrics.span("ocr", pages=len(targets)) as span:
+        pending = {}
+        for position in targets:
+            index = pages[position].index
+            try:
+                key = page_fingerprint(reader.pages[index])
+            except Exception as e:
+                logger.warning("PDF %d쪽 해시 계산 오류: %s", index + 1, e)
+                key = content_hash(
+                    OCR_VERSION, ocr_languages(), pdf_bytes, str(index)
+                )
+            text = ocr_cache.get(key)
+            if text is not None:
+                pages[position] = pages[position]._replace(text=text, error=None)
+                metrics.inc("ocr_pages_total", source="cache")
+            else:
+                pending[position] = key
+        span["cached"] = len(targets) - len(pending)
+
+        incomplete = False
+        if pending:
+            incomplete = _run_ocr(
+                pdf_bytes, pages, pending, executor or get_ocr_pool(), time_budget
+            )
+        span["incomplete"] = incomplete
+    return pages, incomplete
+
+
+def _run_ocr(pdf_bytes, pages, pending, executor, time_budget):
+    deadline = time.time() + time_budget
+    languages = ocr_languages()
+    fd, pdf_path = tempfile.mkstemp(prefix="docx-ai-ocr-", suffix=".pdf")
+    queued = list(pending)  # 아직 맡기지 않은 페이지 위치
+    futures = {}
+    finished = 0
+    timed_out = 0
+
+    def submit_next():
+        position = queued.pop(0)
+        future = executor.submit(
+            _ocr_page,
+            pdf_path,
+            pages[position].index,
+            languages,
+            OCR_DPI,
+            deadline,
+        )
+        futures[future] = position
+        return future
+
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf_bytes)
+        remaining = {submit_next() for _ in range(min(OCR_WORKERS, len(queued)))}
+        while remaining:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            done, remaining = wait(
+                remaining, timeout=timeout, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                # 예산이 끝난 뒤에는 새 페이지를 맡기지 않습니다 (미처리로 남김).
+                if queued and time.time() < deadline:
+                    remaining.add(submit_next())
+                position = futures[future]
+                page = pages[position]
+                try:
+                    text = future.result()
+                except (TimeoutError, subprocess.TimeoutExpired):
+                    # 예산에 걸려 멈춘 페이지는 오류가 아니라 미처리입니다.
+                    timed_out += 1
+                    continue
+                except Exception as e:
+                    logger.warning("PDF %d쪽 OCR 오류: %s", page.index + 1, e)
+                    metrics.inc("ocr_errors_total")
+                    continue
+                ocr_cache.put(pending[position], text)
+                pages[position] = page._replace(text=text, error=None)
+                metrics.inc("ocr_pages_total", source="engine")
+                finished += 1
+
+        unfinished = len(remaining) + len(queued) + timed_out
+        if unfinished:
+            logger.warning(
+                "OCR 시간 예산(%d초) 초과: %d쪽을 처리하지 못했습니다.",
+                time_budget,
+                unfinished,
+            )
+            metrics.inc("ocr_budget_exceeded_total")
+            for future in remaining:
+                future.cancel()
+        return finished < len(pending)
+    finally:
+        try:
+            os.remove(pdf_path)
+        except OSError:
+            pass
@@ -0,0 +1,306 @@
+import logging
+import re
+
+import metrics
+from cache import ContentCache, cache_dir_for, content_hash
+from compaction import SECTION_HEADING_RE
+from mdast import Heading, Table
+from utils import get_env_int
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# 분석 규칙이 바뀌면 버전을 올려 이전 색인 항목을 무효화합니다.
+OUTLINE_VERSION = "1"
+OUTLINE_MAX_ITEMS = get_env_int("TEMPLATE_OUTLINE_MAX_ITEMS", 200)
+# 제목이 이보다 적으면 구성만으로는 서식을 설명하기 어렵다고 보고 전체 텍스트를 씁니다.
+OUTLINE_MIN_HEADINGS = 2
+# 서식의 가장 높은 제목 수준을 DOCX 몇 번째 제목 수준에 둘지 (1은 문서 제목)
+DOCX_LEVEL_OFFSET = 1
+MAX_DOCX_HEADING_LEVEL = 4
+HEADING_MAX_CHARS = 60
+FIELD_LINE_MAX_CHARS = 80
+TABLE_CELL_MAX_CHARS = 8
+
+# 제목 번호의 종류. 서식에서 먼저 나온 종류일수록 높은 수준입니다.
+MARKER_PATTERNS = (
+    ("chapter", re.compile(r"^제\s?\d+\s?([장절조])")),
+    ("roman", re.compile(r"^[ⅠⅡⅢⅣⅤⅥⅦⅧⅨⅩ]+\.?\s")),
+    ("number", re.compile(r"^\d+((?:\.\d+)*)\.\s")),
+    ("number_paren", re.compile(r"^\d+\)\s")),
+    ("hangul", re.compile(r"^[가-하]\.\s")),
+    ("hangul_paren", re.compile(r"^[가-하]\)\s")),
+    ("box", re.compile(r"^([□■◆◇▶])")),
+)
+FIELD_RE = re.compile(r"([가-힣A-Za-z][가-힣A-Za-z0-9()·/]{0,14})\s*[:：]")
+TABLE_SPLIT_RE = re.compile(r"\s*\|\s*|\t|\s{2,}")
+SENTENCE_END_RE = re.compile(r"(?:다|요|음|함)\.?$|[.?!]$")
+# 표 머리글로 자주 쓰이는 낱말. 이 중 하나가 있는 짧은 낱말 줄만 표 머리글로 봅니다.
+HEADER_WORDS = set(
+    "구분 항목 내용 비고 기간 일시 일정 시기 담당 담당자 예산 금액 단가 수량 단위 "
+    "목표 지표 성과 방법 대상 장소 세부 추진 산출 근거 번호 순 연번 학년 과목".split()
+)
+EMPHASIS_RE = re.compile(r"[*_`]")
+
+outline_index = ContentCache(
+    "template_outline",
+    max_entries=get_env_int("TEMPLATE_OUTLINE_ENTRIES", 256),
+    disk_dir=cache_dir_for("template_outline"),
+    max_disk_bytes=get_env_int("TEMPLATE_OUTLINE_DISK_MB", 16) * 1024 * 1024,
+)
+
+
+def _normalize(text):
+    return "".join(EMPHASIS_RE.sub("", text).split()).lower()
+
+
+def marker_kind(text):
+    """제목 번호의 종류를 반환합니다 (예: "roman", "number2", "hangul"). 없으면 None."""
+    for kind, pattern in MARKER_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            if kind == "number":
+                return f"number{match.group(1).count('.') + 1}"
+            if kind in ("chapter", "box"):
+                return f"{kind}:{match.group(1)}"
+            return kind
+    return None
+
+
+def _table_columns(line):
+    """표 머리글 줄이면 열 이름 목록을, 아니면 None을 반환합니다."""
+    cells = [cell for cell in TABLE_SPLIT_RE.split(line) if cell]
+    if len(cells) < 2:
+        cells = line.split()
+    if len(cells) < 3 or len(line) > 60:
+        return None
+    for cell in cells:
+        if len(cell) > TABLE_CELL_MAX_CHARS or any(ch.isdigit() for ch in cell):
+            return None
+    if SENTENCE_END_RE.search(line) or not HEADER_WORDS.intersection(cells):
+        return None
+    return cells
+
+
+class TemplateOutline:
+    """서식 PDF의 구성(번호가 붙은 제목, 입력 항목, 표 머리글)입니다.
+
+    `items`는 서식에 나온 순서대로의 항목 목록입니다.
+
+    - ``["heading", 수준, 텍스트]`` (수준은 1부터)
+    - ``["field", 항목 이름]``
+    - ``["table", [열 이름, ...]]``
+
+    `skeleton`은 프롬프트에 넣는 마크다운 골격이며, 문서 제목(#) 아래에 서식의
+    제목 수준을 둡니다.
+    """
+
+    __slots__ = ("items", "kind_levels", "skeleton", "_levels")
+
+    def __init__(self, items, kind_levels=None):
+        self.items = items
+        self.kind_levels = kind_levels or {}
+        self._levels = {}
+        for item in items:
+            if item[0] == "heading":
+                self._levels.setdefault(_normalize(item[2]), item[1])
+        self.skeleton = render_skeleton(items)
+
+    def __repr__(self):
+        return (
+            f"TemplateOutline(headings={len(self.headings)}, "
+            f"tables={len(self.tables)}, fields={len(self.fields)})"
+        )
+
+    @property
+    def headings(self):
+        return [(item[1], item[2]) for item in self.items if item[0] == "heading"]
+
+    @property
+    def fields(self):
+        return [item[1] for item in self.items if item[0] == "field"]
+
+    @property
+    def tables(self):
+        return [item[1] for item in self.items if item[0] == "table"]
+
+    def is_useful(self):
+        """프롬프트에서 서식 전체 텍스트 대신 쓸 만큼 구성이 드러났는지 확인합니다."""
+        return len(self.headings) >= OUTLINE_MIN_HEADINGS
+
+    def heading_level(self, text):
+        """결과 문서의 제목이 서식에서 어느 수준인지 반환합니다. 모르면 None.
+
+        서식에 같은 제목이 있으면 그 수준을, 없으면 같은 종류의 번호가 쓰인 수준을 씁니다.
+        """
+        level = self._levels.get(_normalize(text))
+        if level is None:
+            level = self.kind_levels.get(marker_kind(text.strip()))
+        return level
+
+    def docx_heading_level(self, text):
+        """서식 수준에 맞춘 DOCX 제목 수준. 서식에서 찾지 못하면 None."""
+        level = self.heading_level(text)
+        if level is None:
+            return None
+        return min(level + DOCX_LEVEL_OFFSET, MAX_DOCX_HEADING_LEVEL)
+
+    def match_table(self, header):
+        """머리글이 가장 비슷한 서식 표의 (열 목록, 열별 머리글 위치).
+
+        절반 이상 겹치는 표가 없으면 None.
+        """
+        best, best_score = None, 0.0
+        for columns in self.tables:
+            mapping = _match_columns(columns, header)
+            matched = sum(1 for index in mapping if index >= 0)
+            score = matched / max(len(columns), len(header))
+            if score > best_score:
+                best, best_score = (columns, mapping), score
+        return best if best_score >= 0.5 else None
+
+    def conform_table(self, header, rows):
+        """표를 서식의 열 순서에 맞춘 (머리글, 행 목록)으로 바꿉니다. 맞출 표가 없으면 None.
+
+        서식에 없는 열은 지우지 않고 뒤에 붙입니다.
+        """
+        if not header:
+            return None
+        match = self.match_table(header)
+        if match is None:
+            return None
+        columns, order = match
+        extra = [i for i in range(len(header)) if i not in order]
+
+        def reshape(row):
+            cells = [row[i] if 0 <= i < len(row) else "" for i in order]
+            return cells + [row[i] for i in extra if i < len(row)]
+
+        new_header = list(columns) + [header[i] for i in extra]
+        return new_header, [reshape(row) for row in rows]
+
+    def conform_block(self, block):
+        """블록을 서식에 맞춘 블록으로 바꿉니다. 바꿀 것이 없으면 그대로 반환합니다.
+
+        서식에 있는 제목은 서식 수준에 맞춘 수준으로, 서식의 표와 머리글이 비슷한
+        표는 서식의 열 순서로 바꿉니다. HTML 미리보기와 DOCX가 같은 블록을 씁니다.
+        """
+        if isinstance(block, Heading):
+            level = self.docx_heading_level(block.text)
+            if level is not None and level != block.level:
+                return Heading(level, block.text)
+        elif isinstance(block, Table):
+            shaped = self.conform_table(block.header, block.rows)
+            if shaped is not None:
+                return Table(*shaped)
+        return block
+
+    def to_json(self):
+        return {"items": self.items, "kind_levels": self.kind_levels}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data["items"], data["kind_levels"])
+
+
+def _match_columns(columns, header):
+    """서식 열마다 대응하는 머리글 셀의 위치 목록을 반환합니다 (없으면 -1).
+
+    머리글 셀 하나는 한 열에만 대응합니다. 모든 열의 이름이 같은 셀을 먼저 찾고,
+    남은 열과 셀끼리 서로 포함하는 이름을 찾습니다.
+    """
+    column_keys = [_normalize(column) for column in columns]
+    free = {index: _normalize(cell) for index, cell in enumerate(header)}
+    free = {index: key for index, key in free.items() if key}
+    mapping = [-1] * len(columns)
+    for position, column_key in enumerate(column_keys):
+        for index, key in free.items():
+            if key == column_key:
+                mapping[position] = index
+                del free[index]
+                break
+    for position, column_key in enumerate(column_keys):
+        if mapping[position] >= 0 or not column_key:
+            continue
+        for index, key in free.items():
+            if key in column_key or column_key in key:
+                mapping[position] = index
+                del free[index]
+                break
+    return mapping
+
+
+def render_skeleton(items):
+    """구성 항목을 프롬프트용 마크다운 골격으로 만듭니다."""
+    lines = []
+    for item in items:
+        if item[0] == "heading":
+            level = min(item[1] + DOCX_LEVEL_OFFSET, 6)
+            lines.append(f"{'#' * level} {item[2]}")
+        elif item[0] == "field":
+            lines.append(f"- {item[1]}:")
+        elif item[0] == "table":
+            lines.append("| " + " | ".join(item[1]) + " |")
+            lines.append("|" + "---|" * len(item[1]))
+    return "\n".join(lines)
+
+
+def analyze_template(pages):
+    """서식 페이지 텍스트에서 TemplateOutline을 만듭니다."""
+    items = []
+    kind_levels = {}
+    seen_fields = set()
+    for page in pages:
+        for raw_line in page.splitlines():
+            line = raw_line.strip()
+            if not line:
+                continue
+            for item in _classify_line(line, kind_levels, seen_fields):
+                if not items or items[-1] != item:
+                    items.append(item)
+            if len(items) >= OUTLINE_MAX_ITEMS:
+                return TemplateOutline(items[:OUTLINE_MAX_ITEMS], kind_levels)
+    return TemplateOutline(items, kind_levels)
+
+
+def _classify_line(line, kind_levels, seen_fields):
+    """한 줄에서 찾은 구성 항목 목록을 반환합니다."""
+    if SECTION_HEADING_RE.match(line) and len(line) <= HEADING_MAX_CHARS:
+        kind = marker_kind(line)
+        if kind is not None:
+            if kind not in kind_levels:
+                kind_levels[kind] = len(kind_levels) + 1
+            return [["heading", kind_levels[kind], " ".join(line.split())]]
+
+    columns = _table_columns(line)
+    if columns is not None:
+        return [["table", columns]]
+
+    if len(line) > FIELD_LINE_MAX_CHARS:
+        return []
+    # 한 줄에 항목이 여러 개 있을 수 있습니다 (예: "성명: 소속:").
+    # 쪽마다 반복되는 항목은 처음 한 번만 남깁니다.
+    items = []
+    for label in FIELD_RE.findall(line):
+        label = label.strip()
+        if label not in seen_fields:
+            seen_fields.add(label)
+            items.append(["field", label])
+    return items
+
+
+def get_template_outline(pages):
+    """서식 구성을 반환합니다. 같은 내용의 서식은 색인에 저장된 결과를 씁니다."""
+    key = content_hash(OUTLINE_VERSION, *pages)
+    with metrics.span("template_outline") as span:
+        cached = outline_index.get(key)
+        span["cache_hit"] = cached is not None
+        if cached is not None:
+            outline = TemplateOutline.from_json(cached)
+        else:
+            outline = analyze_template(pages)
+            outline_index.put(key, outline.to_json())
+        span["headings"] = len(outline.headings)
+        span["tables"] = len(outline.tables)
+        span["fields"] = len(outline.fields)
+    return outline
@@ -0,0 +1,284 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+
+import metrics
+from utils import get_env_float, get_env_int
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# 0이면 제한 없음
+REQUESTS_PER_MINUTE = get_env_int("LLM_REQUESTS_PER_MINUTE", 0)
+TOKENS_PER_MINUTE = get_env_int("LLM_TOKENS_PER_MINUTE", 0)
+MAX_RETRIES = get_env_int("LLM_MAX_RETRIES", 3)
+RETRY_BASE_DELAY = get_env_float("LLM_RETRY_BASE_DELAY", 1.0)  # 초
+RETRY_MAX_DELAY = get_env_float("LLM_RETRY_MAX_DELAY", 30.0)  # 초
+# 토큰 수를 정확히 셀 수 없으므로 글자 수로 어림합니다 (한국어 기준 보수적으로).
+CHARS_PER_TOKEN = 2
+
+DEFAULT_SESSION = "default"
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+TRANSIENT_ERROR_NAMES = {
+    "ResourceExhausted",
+    "TooManyRequests",
+    "ServiceUnavailable",
+    "DeadlineExceeded",
+    "InternalServerError",
+}
+
+CONTINUATION_PROMPT = """{prompt}
+
+---
+
+## 지금까지 작성한 내용:
+{partial}
+
+**연결이 끊겨 위 내용까지만 전달되었습니다. 이미 작성한 부분은 반복하지 말고, 마지막 문장 바로 다음부터 이어서 작성하세요.**
+"""
+
+
+def estimate_tokens(text):
+    """글자 수로 토큰 수를 어림합니다."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def is_transient_error(error):
+    """다시 시도하면 성공할 수 있는 오류(요청 한도 초과, 일시적 서버 오류 등)인지 확인합니다."""
+    if isinstance(error, (TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    if type(error).__name__ in TRANSIENT_ERROR_NAMES:
+        return True
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    try:
+        return int(code) in TRANSIENT_STATUS_CODES
+    except (TypeError, ValueError):
+        return False
+
+
+def continuation_prompt(prompt_text, partial_text):
+    """중간에 끊긴 응답을 이어서 받기 위한 프롬프트를 만듭니다."""
+    return CONTINUATION_PROMPT.format(prompt=prompt_text, partial=partial_text)
+
+
+def backoff_delay(attempt, base=RETRY_BASE_DELAY, maximum=RETRY_MAX_DELAY):
+    """`attempt`번째 재시도 전 대기 시간 (지수 백오프 + full jitter)."""
+    return random.uniform(0, min(maximum, base * 2 ** (attempt - 1)))
+
+
+class TokenBucket:
+    """분당 허용량을 초 단위로 채워 넣는 토큰 버킷입니다. 0이면 제한 없음."""
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        refilled = self.tokens + (now - self._updated) * self.rate
+        self.tokens = min(self.capacity, refilled)
+        self._updated = now
+
+    def delay_for(self, amount, now):
+        """`amount`만큼 쓸 수 있을 때까지 남은 시간(초)을 반환합니다."""
+        if not self.capacity:
+            return 0.0
+        self._refill(now)
+        # 버킷보다 큰 요청은 버킷이 가득 찼을 때 보냅니다.
+        needed = min(amount, self.capacity) - self.tokens
+        return max(0.0, needed / self.rate)
+
+    def take(self, amount, now):
+        """`amount`만큼 씁니다. 사용량이 예상보다 많으면 음수가 되어 다음 요청을 늦춥니다."""
+        if self.capacity:
+            self._refill(now)
+            self.tokens -= amount
+
+
+class _Waiter:
+    __slots__ = ("future", "tokens", "enqueued")
+
+    def __init__(self, future, tokens):
+        self.future = future
+        self.tokens = tokens
+        self.enqueued = time.monotonic()
+
+
+class GenerationScheduler:
+    """프로세스 전체에서 LLM 호출을 분당 요청/토큰 한도 안으로 조절하는 스케줄러입니다.
+
+    전용 이벤트 루프 스레드에서 동작합니다. 한도를 넘는 요청은 세션별 대기열에 들어가고,
+    세션을 돌아가며 하나씩 내보내므로 한 세션이 대기열을 독차지하지 않습니다.
+    일시적 오류는 지수 백오프로 다시 시도하며, 이미 받은 부분은 버리지 않고
+    이어쓰기 프롬프트로 나머지만 받습니다.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute=REQUESTS_PER_MINUTE,
+        tokens_per_minute=TOKENS_PER_MINUTE,
+        max_retries=MAX_RETRIES,
+        retry_base_delay=RETRY_BASE_DELAY,
+        retry_max_delay=RETRY_MAX_DELAY,
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self._queues = OrderedDict()  # 세션 ID -> deque[_Waiter]
+        self._depth = 0
+        self._wakeup = None
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        threading.Thread(target=self._run_loop, daemon=True).start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._wakeup = asyncio.Event()
+        self._loop.create_task(self._dispatch())
+        self._ready.set()
+        self._loop.run_forever()
+
+    # --- Queue ---
+    async def acquire(self, session_id, tokens):
+        """요청 하나를 보낼 수 있을 때까지 기다립니다 (스케줄러 루프에서 호출)."""
+        waiter = _Waiter(self._loop.create_future(), tokens)
+        self._queues.setdefault(session_id or DEFAULT_SESSION, deque()).append(waiter)
+        self._depth += 1
+        self._update_gauges()
+        self._wakeup.set()
+        await waiter.future
+
+    async def _dispatch(self):
+        while True:
+            if not self._queues:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            session_id, queue = next(iter(self._queues.items()))
+            waiter = queue[0]
+            if waiter.future.cancelled():
+                self._pop(session_id, queue)
+                continue
+
+            now = time.monotonic()
+            delay = max(
+                self.requests.delay_for(1, now),
+                self.tokens.delay_for(waiter.tokens, now),
+            )
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            self._pop(session_id, queue)
+            self.requests.take(1, now)
+            self.tokens.take(waiter.tokens, now)
+            waited = now - waiter.enqueued
+            metrics.observe("scheduler_wait_seconds", waited)
+            waiter.future.set_result(waited)
+
+    def _pop(self, session_id, queue):
+        queue.popleft()
+        self._depth -= 1
+        # 차례가 끝난 세션은 맨 뒤로 보냅니다 (라운드 로빈).
+        del self._queues[session_id]
+        if queue:
+            self._queues[session_id] = queue
+        self._update_gauges()
+
+    def _update_gauges(self):
+        metrics.set_gauge("scheduler_queue_depth", self._depth)
+        metrics.set_gauge("scheduler_sessions_waiting", len(self._queues))
+
+    # --- Streaming ---
+    async def _stream(self, backend, prompt_text, session_id):
+        partial = []
+        attempt = 0
+        while True:
+            request_prompt = (
+                continuation_prompt(prompt_text, "".join(partial))
+                if partial
+                else prompt_text
+            )
+            await self.acquire(session_id, estimate_tokens(request_prompt))
+            received = 0
+            try:
+                async for text in backend.astream(request_prompt):
+                    received += len(text)
+                    partial.append(text)
+                    yield text
+                return
+            except Exception as e:
+                if attempt >= self.max_retries or not is_transient_error(e):
+                    raise
+                attempt += 1
+                delay = backoff_delay(
+                    attempt, self.retry_base_delay, self.retry_max_delay
+                )
+                metrics.inc("generation_retries_total")
+                logger.warning(
+                    "LLM 일시적 오류, %.1f초 후 다시 시도합니다 (%d/%d): %s",
+                    delay,
+                    attempt,
+                    self.max_retries,
+                    e,
+                )
+                await asyncio.sleep(delay)
+            finally:
+                # 받은 응답만큼 토큰 한도에 반영합니다.
+                self.tokens.take(-(-received // CHARS_PER_TOKEN), time.monotonic())
+
+    async def astream(self, backend, prompt_text, session_id=None):
+        """다른 이벤트 루프에서 사용하는 비동기 스트림입니다."""
+        stream = self._stream(backend, prompt_text, session_id)
+        try:
+            while True:
+                step = asyncio.run_coroutine_threadsafe(stream.__anext__(), self._loop)
+                try:
+                    yield await asyncio.wrap_future(step)
+                except StopAsyncIteration:
+                    return
+        finally:
+            await asyncio.wrap_future(
+                asyncio.run_coroutine_threadsafe(stream.aclose(), self._loop)
+            )
+
+    def stream(self, backend, prompt_text, session_id=None):
+        """스레드(Streamlit 세션 등)에서 사용하는 동기 스트림입니다."""
+        stream = self._stream(backend, prompt_text, session_id)
+        try:
+            while True:
+                step = asyncio.run_coroutine_threadsafe(stream.__anext__(), self._loop)
+                try:
+                    yield step.result()
+                except StopAsyncIteration:
+                    return
+        finally:
+            asyncio.run_coroutine_threadsafe(stream.aclose(), self._loop).result()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """프로세스 전체에서 공유하는 스케줄러를 반환합니다. 처음 호출할 때 만듭니다."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = GenerationScheduler()
+        return _scheduler
+
+
+def set_scheduler(scheduler):
+    """사용할 스케줄러를 교체하고 이전 스케줄러를 반환합니다."""
+    global _scheduler
+    with _scheduler_lock:
+        previous, _scheduler = _scheduler, scheduler
+        return previous
@@ -0,0 +1,103 @@
+from mdast import BlockParser, Heading, block_title_text, render_html
+
+
+class Section:
+    """제목 줄로 나눈 결과 문서의 한 부분입니다.
+
+    `markdown`은 원문, `blocks`는 파싱한 블록 노드입니다. `html`과 `fragments`
+    (DOCX 본문 요소 XML 목록)는 한 번 렌더링한 결과를 보관해 두었다가,
+    다른 부분을 다시 작성할 때 그대로 재사용합니다.
+    """
+
+    __slots__ = ("heading", "markdown", "blocks", "html", "fragments")
+
+    def __init__(self, heading, markdown, blocks, html=None, fragments=None):
+        self.heading = heading  # 첫 제목 텍스트 (제목 앞부분이면 빈 문자열)
+        self.markdown = markdown
+        self.blocks = blocks
+        self.html = html
+        self.fragments = fragments
+
+    def __repr__(self):
+        return f"Section(heading={self.heading!r}, blocks={len(self.blocks)})"
+
+
+def section_level(blocks):
+    """부분을 나눌 제목 수준을 고릅니다.
+
+    두 번 이상 나오는 제목 중 가장 높은 수준을 씁니다 (문서 제목 `#` 하나는 제외).
+    제목이 없으면 None.
+    """
+    counts = {}
+    for block in blocks:
+        if isinstance(block, Heading):
+            counts[block.level] = counts.get(block.level, 0) + 1
+    repeated = [level for level, count in counts.items() if count > 1]
+    if repeated:
+        return min(repeated)
+    return min(counts) if counts else None
+
+
+def split_sections(markdown_text, blocks=None, spans=None):
+    """마크다운을 제목 줄 기준의 Section 목록으로 나눕니다.
+
+    이미 파싱한 `blocks`와 블록별 원문 줄 범위 `spans`(`BlockParser.spans`)를 주면
+    다시 파싱하지 않고 나눕니다. 각 부분의 블록을 이어 붙이면 `blocks`와 같습니다.
+    """
+    if blocks is None:
+        parser = BlockParser()
+        blocks = parser.feed(markdown_text) + parser.close()
+        spans = parser.spans
+    lines = markdown_text.splitlines(keepends=True)
+    level = section_level(blocks)
+
+    sections = []
+    start = 0
+    current = []
+    for block, (first_line, _) in zip(blocks, spans):
+        if isinstance(block, Heading) and block.level == level and first_line > start:
+            sections.append(("".join(lines[start:first_line]), current))
+            start, current = first_line, []
+        current.append(block)
+    sections.append(("".join(lines[start:]), current))
+
+    result = []
+    for markdown, blocks in sections:
+        if not blocks and not markdown.strip():
+            continue  # 빈 앞부분
+        heading = next(
+            (block_title_text(b) for b in blocks if isinstance(b, Heading)), ""
+        )
+        result.append(Section(heading, markdown, blocks))
+    return result
+
+
+def join_sections(sections):
+    """Section 목록을 하나의 마크다운 텍스트로 합칩니다."""
+    return "".join(_with_blank_line(section.markdown) for section in sections)
+
+
+def _with_blank_line(markdown):
+    # 다음 부분의 제목이 앞 문단에 붙지 않도록 빈 줄로 끝나게 합니다.
+    return markdown.rstrip("\n") + "\n\n"
+
+
+def section_html(section):
+    """부분의 HTML을 반환합니다. 처음 한 번만 렌더링합니다."""
+    if section.html is None:
+        section.html = render_html(section.blocks)
+    return section.html
+
+
+def sections_html(sections):
+    return "\n".join(section_html(section) for section in sections)
+
+
+def section_outline(sections, marked_index=None):
+    """문서의 부분 제목 목록을 마크다운 목록으로 만듭니다."""
+    lines = []
+    for index, section in enumerate(sections):
+        heading = section.heading or "(머리말)"
+        mark = "  ← 다시 작성할 부분" if index == marked_index else ""
+        lines.append(f"- {heading}{mark}")
+    return "\n".join(lines)
@@ -0,0 +1,102 @@
+import threading
+
+
+class _Flight:
+    """진행 중인 상류 스트림 하나의 상태입니다."""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.cancelled = False
+        self.error = None
+        self.subscribers = 0
+        self.cond = threading.Condition()
+
+
+class SingleFlight:
+    """같은 키로 동시에 들어온 스트리밍 요청을 하나의 상류 호출로 합칩니다.
+
+    처음 요청이 생산자가 되어 별도 스레드에서 상류 스트림을 읽고, 이후 같은 키의
+    요청은 구독자로 붙어 이미 받은 청크를 먼저 받은 뒤 새 청크를 이어서 받습니다.
+    마지막 구독자가 떠나면 상류 스트림을 닫습니다.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def stream(self, key, producer):
+        """`key`에 대한 청크 제너레이터를 반환합니다.
+
+        `producer`는 인자 없이 호출하면 청크 이터레이터를 반환하는 함수이며,
+        같은 키로 진행 중인 스트림이 없을 때만 호출됩니다.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            is_producer = flight is None
+            if is_producer:
+                flight = _Flight()
+                self._flights[key] = flight
+            flight.subscribers += 1
+
+        if is_producer:
+            threading.Thread(
+                target=self._produce, args=(key, flight, producer), daemon=True
+            ).start()
+        return self._subscribe(key, flight)
+
+    def in_flight(self):
+        """현재 진행 중인 상류 스트림 수를 반환합니다."""
+        with self._lock:
+            return len(self._flights)
+
+    def _produce(self, key, flight, producer):
+        iterator = None
+        try:
+            iterator = producer()
+            for chunk in iterator:
+                with flight.cond:
+                    if flight.cancelled:
+                        break
+                    flight.chunks.append(chunk)
+                    flight.cond.notify_all()
+        except Exception as e:
+            flight.error = e
+        finally:
+            if iterator is not None and hasattr(iterator, "close"):
+                iterator.close()  # 취소된 경우 상류 스트림을 닫음
+            self._forget(key, flight)
+            with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
+
+    def _subscribe(self, key, flight):
+        index = 0
+        try:
+            while True:
+                with flight.cond:
+                    while index >= len(flight.chunks) and not flight.done:
+                        flight.cond.wait()
+                    new_chunks = flight.chunks[index:]
+                    index += len(new_chunks)
+                    finished = flight.done and index >= len(flight.chunks)
+                yield from new_chunks
+                if finished:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            with self._lock:
+                flight.subscribers -= 1
+                cancel = flight.subscribers == 0 and not flight.done
+                if cancel and self._flights.get(key) is flight:
+                    # 취소될 스트림에 새 요청이 붙지 않도록 같은 잠금 안에서 뺍니다.
+                    del self._flights[key]
+            if cancel:
+                with flight.cond:
+                    flight.cancelled = True
+
+    def _forget(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+
+import metrics
+from cache import ContentCache, cache_dir_for, content_hash
+from compaction import split_sections
+from llm import get_backend
+from scheduler import get_scheduler
+from utils import get_env_int
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# 참고 텍스트가 이 글자 수를 넘으면 요약해서 프롬프트에 넣습니다 (0이면 끔).
+SUMMARY_THRESHOLD_CHARS = get_env_int("REFERENCE_SUMMARY_THRESHOLD", 0)
+SUMMARY_CHUNK_CHARS = get_env_int("REFERENCE_SUMMARY_CHUNK_CHARS", 12000)
+SUMMARY_CONCURRENCY = get_env_int("REFERENCE_SUMMARY_CONCURRENCY", 4)
+# 요약을 합친 결과가 여전히 길면 요약을 다시 요약하는 최대 단계
+SUMMARY_MAX_ROUNDS = 2
+# 요약 프롬프트가 바뀌면 버전을 올려 이전 캐시 항목을 무효화합니다.
+SUMMARY_PROMPT_VERSION = "1"
+
+SUMMARY_PROMPT = """다음은 긴 참고 자료의 일부({index}/{total})입니다.
+
+{chunk}
+
+---
+
+**위 내용을 계획서/보고서 작성에 참고할 수 있도록 한국어로 요약하세요.**
+**수치, 날짜, 기관/사업 이름, 목표와 성과 지표는 빠뜨리지 말고 그대로 옮기세요.**
+**원문의 항목 구조(제목, 번호)를 유지하고, 마크다운 목록으로 간결하게 작성하세요.**
+"""
+
+summary_cache = ContentCache(
+    "reference_summary",
+    max_entries=get_env_int("SUMMARY_CACHE_ENTRIES", 512),
+    disk_dir=cache_dir_for("reference_summary"),
+    max_disk_bytes=get_env_int("SUMMARY_CACHE_DISK_MB", 64) * 1024 * 1024,
+)
+
+
+def split_chunks(text, chunk_chars=SUMMARY_CHUNK_CHARS):
+    """텍스트를 `chunk_chars` 안팎의 조각으로 나눕니다.
+
+    가능하면 절(제목 줄) 경계에서 나누고, 한 절이 너무 길면 줄 경계에서 나눕니다.
+    """
+    chunks = []
+    current = []
+    size = 0
+    for section in split_sections(text.splitlines()):
+        section_size = sum(len(line) + 1 for line in section)
+        if current and size + section_size > chunk_chars:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        for line in section:
+            if current and size + len(line) + 1 > chunk_chars:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(line)
+            size += len(line) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+async def _summarize_chunk(backend, chunk, index, total, semaphore, session_id):
+    cache_key = content_hash(
+        SUMMARY_PROMPT_VERSION, backend.name, backend.cache_identity(), chunk
+    )
+    cached = summary_cache.get(cache_key)
+    if cached is not None:
+        metrics.inc("reference_summary_chunks_total", source="cache")
+        return cached
+
+    prompt_text = SUMMARY_PROMPT.format(index=index, total=total, chunk=chunk)
+    async with semaphore:
+        try:
+            parts = [
+                text
+                async for text in get_scheduler().astream(
+                    backend, prompt_text, session_id
+                )
+            ]
+        except Exception as e:
+            # 요약에 실패한 조각은 원문을 그대로 씁니다.
+            logger.warning("참고 자료 %d/%d 요약 오류: %s", index, total, e)
+            metrics.inc("reference_summary_errors_total")
+            return chunk
+    summary = "".join(parts).strip()
+    if not summary:
+        return chunk
+    metrics.inc("reference_summary_chunks_total", source="model")
+    summary_cache.put(cache_key, summary)
+    return summary
+
+
+async def asummarize_text(
+    text,
+    chunk_chars=SUMMARY_CHUNK_CHARS,
+    concurrency=SUMMARY_CONCURRENCY,
+    session_id=None,
+    backend=None,
+):
+    """긴 텍스트를 조각별로 동시에 요약(map)한 뒤 하나로 합칩니다(reduce)."""
+    backend = backend or get_backend()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    digest = text
+    for _ in range(SUMMARY_MAX_ROUNDS):
+        chunks = split_chunks(digest, chunk_chars)
+        summaries = await asyncio.gather(
+            *[
+                _summarize_chunk(
+                    backend, chunk, index, len(chunks), semaphore, session_id
+                )
+                for index, chunk in enumerate(chunks, start=1)
+            ]
+        )
+        digest = "\n\n".join(
+            f"### 참고 자료 요약 {index}/{len(summaries)}\n{summary}"
+            for index, summary in enumerate(summaries, start=1)
+        )
+        if len(digest) <= chunk_chars:
+            break
+    return digest
+
+
+def summarize_text(text, **kwargs):
+    """`asummarize_text`의 동기 버전입니다 (Streamlit 세션, 배치 작업 스레드용)."""
+    return asyncio.run(asummarize_text(text, **kwargs))
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# 저장소 최상위의 모듈(model, scheduler 등)을 바로 불러올 수 있게 합니다.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 테스트는 API 키, 디스크 캐시 없이 실행합니다.
+os.environ.pop("GEMINI_API_KEY", None)
+os.environ.pop("CACHE_DIR", None)
+os.environ.setdefault("LLM_BACKEND", "fake")
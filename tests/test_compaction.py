@@ -0,0 +1,31 @@
+from compaction import compact_pages
+
+
+def budget_page(number):
+    return "\n".join(
+        [
+            "2025학년도 학교교육계획서",
+            f"{number}. 예산 계획",
+            "구분",
+            "금액",
+            "인건비",
+            f"{number * 100}",
+            "합계",
+            f"{number * 100}",
+            f"- {number} -",
+        ]
+    )
+
+
+def test_repeated_header_kept_once_and_page_numbers_removed():
+    result = compact_pages([budget_page(n) for n in range(1, 5)])
+    lines = result.text.splitlines()
+    assert lines.count("2025학년도 학교교육계획서") == 1
+    assert not any(line.startswith("- ") for line in lines)
+
+
+def test_short_repeated_body_lines_are_kept_on_every_page():
+    result = compact_pages([budget_page(n) for n in range(1, 5)])
+    lines = result.text.splitlines()
+    for label in ["구분", "금액", "인건비", "합계"]:
+        assert lines.count(label) == 4
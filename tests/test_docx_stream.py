@@ -0,0 +1,117 @@
+"""DocxStreamBuilder가 청크를 어떻게 나누어 받아도 한 번에 변환한 결과와 같은지 확인합니다.
+
+user-008(공유 블록 AST)에서 의도적으로 바뀐 동작 (이 테스트의 기대값에 반영됨):
+
+- 코드 블록(```)과 인용문(>)을 미리보기와 DOCX에서 같은 블록으로 처리합니다.
+- 표는 GFM처럼 표가 아닌 첫 줄에서 끝납니다.
+- 제목 수준은 맨 앞의 '#' 개수만 셉니다.
+- 제목과 목록 항목 안의 **굵게**, *기울임*도 DOCX에 반영합니다.
+- 표의 가운데 빈 셀은 ""로 남아 열 위치가 유지됩니다.
+- 들여쓴 목록 항목은 하위 목록이 됩니다.
+"""
+
+import io
+import random
+import zipfile
+
+import pytest
+
+import model
+from mdast import BlockParser, parse_markdown
+
+MARKDOWN = (
+    "# 2025학년도 **프로젝트** 계획서\r\n"
+    "\r\n"
+    "## 1. 목적\n"
+    "학생 주도 *탐구* 활동을 운영합니다.\n"
+    "두 번째 줄입니다.\n"
+    "\n"
+    "- 항목 하나\n"
+    "  - 하위 항목\n"
+    "    1. 번호 하위 항목\n"
+    "- 항목 둘\n"
+    "\n"
+    "| 주차 | 활동 | 비고 |\n"
+    "|---|:---:|---|\n"
+    "| 1주 |  | 완료 |\n"
+    "| 2주 | 발표 | |\n"
+    "표 다음 문단\n"
+    "\n"
+    "가격 | 수량 은 표가 아닌 문단입니다.\n"
+    "다음 줄\n"
+    "\n"
+    "> 인용문 **강조**\n"
+    "> 둘째 줄\n"
+    "\n"
+    "```python\n"
+    "print('| 표 아님 |')\n"
+    "```\n"
+    "\n"
+    "---\n"
+    "### 3. 예산\r\n"
+    "| 항목 | 금액 |\r\n"
+    "|---|---|\r\n"
+    "| 인건비 | 200 |"
+)
+
+
+def document_xml(docx_data):
+    with zipfile.ZipFile(io.BytesIO(docx_data.getvalue())) as archive:
+        return archive.read("word/document.xml")
+
+
+def random_chunks(text, rng):
+    chunks = []
+    position = 0
+    while position < len(text):
+        size = rng.choice([1, 1, 2, 3, 5, 8, 13, 40])
+        chunks.append(text[position : position + size])
+        position += size
+    return chunks
+
+
+@pytest.fixture(scope="module")
+def one_shot():
+    title, docx_data = model.markdown_to_docx(MARKDOWN)
+    return title, document_xml(docx_data)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_chunked_feed_matches_one_shot(seed, one_shot):
+    builder = model.DocxStreamBuilder()
+    for chunk in random_chunks(MARKDOWN, random.Random(seed)):
+        builder.feed(chunk)
+    title, docx_data = builder.finish()
+
+    assert builder.blocks == parse_markdown(MARKDOWN)
+    assert (title, document_xml(docx_data)) == one_shot
+
+
+def test_crlf_split_between_chunks():
+    builder = model.DocxStreamBuilder()
+    for chunk in ["# 제목\r", "\n| a | b |\r", "\n|---|---|\r", "\n| 1 | 2 |\r", "\n"]:
+        builder.feed(chunk)
+    builder.close()
+    assert builder.blocks == parse_markdown("# 제목\n| a | b |\n|---|---|\n| 1 | 2 |\n")
+
+
+def test_block_spans_point_at_source_lines():
+    parser = BlockParser()
+    blocks = parser.feed(MARKDOWN) + parser.close()
+    lines = MARKDOWN.splitlines(keepends=True)
+
+    assert len(parser.spans) == len(blocks)
+    for block, (start, end) in zip(blocks, parser.spans):
+        assert parse_markdown("".join(lines[start:end])) == [block]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_chunked_spans_match_one_shot(seed):
+    parser = BlockParser()
+    parser.feed(MARKDOWN)
+    parser.close()
+    builder = model.DocxStreamBuilder()
+    for chunk in random_chunks(MARKDOWN, random.Random(seed)):
+        builder.feed(chunk)
+    builder.close()
+    assert builder.spans == parser.spans
@@ -0,0 +1,23 @@
+from mdast import render_inline_html
+
+
+def test_link_url_cannot_leave_href_attribute():
+    rendered = render_inline_html('[click](http://x"onmouseover="alert(1))')
+    assert rendered.startswith('<a href="http://x&quot;onmouseover=&quot;alert(1">')
+    assert 'onmouseover="' not in rendered
+
+
+def test_link_url_ampersand_escaped_once():
+    rendered = render_inline_html("[링크](https://a.b/?x=1&y=2)")
+    assert rendered == '<a href="https://a.b/?x=1&amp;y=2">링크</a>'
+
+
+def test_code_span_is_not_emphasized():
+    rendered = render_inline_html("`a*b*c` 와 *강조* `**x**`")
+    assert rendered == (
+        "<code>a*b*c</code> 와 <em>강조</em> <code>**x**</code>"
+    )
+
+
+def test_code_span_content_is_escaped():
+    assert render_inline_html("`<b>`") == "<code>&lt;b&gt;</code>"
@@ -0,0 +1,60 @@
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+import ocr
+from extraction import PageText
+
+
+@pytest.fixture
+def fake_engine(monkeypatch):
+    """OCR 엔진 대신 페이지별 동작을 정할 수 있는 가짜 `_ocr_page`를 씁니다."""
+    behaviours = {}
+
+    def fake_ocr_page(pdf_path, index, languages, dpi, deadline):
+        action = behaviours.get(index, "ok")
+        if action == "slow":
+            # subprocess의 timeout처럼 예산 직전에 시간 초과로 끝납니다.
+            time.sleep(max(0.0, deadline - time.time() - 0.1))
+            raise subprocess.TimeoutExpired("tesseract", 0)
+        if action == "error":
+            raise subprocess.CalledProcessError(1, "tesseract")
+        return f"OCR {index}"
+
+    monkeypatch.setattr(ocr, "ocr_languages", lambda: "kor")
+    monkeypatch.setattr(ocr, "_ocr_page", fake_ocr_page)
+    monkeypatch.setattr(ocr, "OCR_WORKERS", 2)
+    ocr.ocr_cache.clear()
+    return behaviours
+
+
+def run(page_count, time_budget=1.0):
+    pages = [PageText(index, "", None) for index in range(page_count)]
+    reader = SimpleNamespace(pages=[None] * page_count)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        return ocr.ocr_pages(
+            reader, b"%PDF-test", pages, executor=executor, time_budget=time_budget
+        )
+
+
+def test_all_pages_done_is_complete(fake_engine):
+    pages, incomplete = run(3)
+    assert [page.text for page in pages] == ["OCR 0", "OCR 1", "OCR 2"]
+    assert not incomplete
+
+
+def test_pages_stopped_by_budget_are_unfinished(fake_engine):
+    fake_engine.update({0: "slow", 1: "slow"})
+    pages, incomplete = run(4, time_budget=0.5)
+    assert incomplete
+    assert [page.text for page in pages] == ["", "", "OCR 2", "OCR 3"]
+
+
+def test_engine_error_leaves_document_incomplete(fake_engine):
+    fake_engine[1] = "error"
+    pages, incomplete = run(3)
+    assert incomplete
+    assert [page.text for page in pages] == ["OCR 0", "", "OCR 2"]
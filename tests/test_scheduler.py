@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from llm import FakeBackend
+from scheduler import GenerationScheduler, TokenBucket, continuation_prompt
+
+TIMEOUT = 5  # 초
+
+
+class FlakyBackend(FakeBackend):
+    """첫 호출에서 일부만 보내고 끊기는 가짜 백엔드입니다."""
+
+    def __init__(self, partial, rest, error=ConnectionError):
+        super().__init__(rest)
+        self.partial = partial
+        self.error = error
+        self.prompts = []
+
+    async def astream(self, prompt_text):
+        self.prompts.append(prompt_text)
+        if len(self.prompts) == 1:
+            yield self.partial
+            raise self.error("연결 끊김")
+        async for text in super().astream(prompt_text):
+            yield text
+
+
+def test_sessions_are_dispatched_round_robin():
+    scheduler = GenerationScheduler(max_retries=0)
+    # 0.1초에 하나씩 내보내도록 버킷을 비워 두면 네 요청이 모두 대기열에 쌓입니다.
+    scheduler.requests = TokenBucket(600)
+    scheduler.requests.capacity = 1
+    scheduler.requests.tokens = 0
+    order = []
+
+    async def take(label):
+        await scheduler.acquire(label, 1)
+        order.append(label)
+
+    futures = [
+        asyncio.run_coroutine_threadsafe(take(label), scheduler._loop)
+        for label in ["A", "A", "A", "B"]
+    ]
+    for future in futures:
+        future.result(TIMEOUT)
+    assert order == ["A", "B", "A", "A"]
+
+
+def test_retry_continues_after_partial_output():
+    scheduler = GenerationScheduler(max_retries=2, retry_base_delay=0)
+    backend = FlakyBackend("앞부분, ", "뒷부분입니다.")
+
+    text = "".join(scheduler.stream(backend, "프롬프트", session_id="s"))
+
+    assert text == "앞부분, 뒷부분입니다."
+    assert backend.prompts == [
+        "프롬프트",
+        continuation_prompt("프롬프트", "앞부분, "),
+    ]
+
+
+def test_non_transient_error_is_not_retried():
+    scheduler = GenerationScheduler(max_retries=2, retry_base_delay=0)
+    backend = FlakyBackend("앞부분, ", "뒷부분입니다.", error=ValueError)
+
+    with pytest.raises(ValueError):
+        "".join(scheduler.stream(backend, "프롬프트"))
+    assert len(backend.prompts) == 1
@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+import model
+from mdast import parse_markdown
+from sections import split_sections
+
+MARKDOWN = (
+    "# 계획서\n"
+    "머리말 문단\n"
+    "\n"
+    "## 1. 목적\n"
+    "| 구분 | 내용 |\n"
+    "|---|---|\n"
+    "| 가 | 나 |\n"
+    "## 2. 방법\r\n"
+    "- 항목\r\n"
+    "  - 하위 항목\r\n"
+    "\r\n"
+    "```\n"
+    "## 코드 안의 제목 아님\n"
+    "```\n"
+    "## 3. 예산\n"
+    "합계 | 100"
+)
+
+
+def test_sections_join_back_to_source():
+    sections = split_sections(MARKDOWN)
+    assert [section.heading for section in sections] == [
+        "계획서",
+        "1. 목적",
+        "2. 방법",
+        "3. 예산",
+    ]
+    assert "".join(section.markdown for section in sections) == MARKDOWN
+    for section in sections:
+        assert parse_markdown(section.markdown) == section.blocks
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sections_from_builder_match_one_shot_split(seed):
+    rng = random.Random(seed)
+    builder = model.DocxStreamBuilder()
+    position = 0
+    while position < len(MARKDOWN):
+        size = rng.choice([1, 2, 3, 7, 20])
+        builder.feed(MARKDOWN[position : position + size])
+        position += size
+    builder.finish()
+
+    sections = model.sections_from_builder(MARKDOWN, builder)
+    expected = split_sections(MARKDOWN)
+    assert [s.markdown for s in sections] == [s.markdown for s in expected]
+    assert [s.blocks for s in sections] == [s.blocks for s in expected]
+    assert sum(len(s.fragments) for s in sections) == sum(builder.block_sizes)
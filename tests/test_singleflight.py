@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+from llm import FakeBackend
+from singleflight import SingleFlight
+
+TIMEOUT = 5  # 초
+
+RESPONSE = "".join(f"[{i:02d}]" for i in range(20))
+
+
+def slow_backend():
+    # 4글자씩 20개 청크, 청크 사이 20ms: 두 번째 요청이 도중에 붙을 시간이 있습니다.
+    return FakeBackend(RESPONSE, chunk_chars=4, chunk_delay=0.02)
+
+
+def test_late_joiner_receives_buffered_prefix():
+    backend = slow_backend()
+    flights = SingleFlight()
+    first = flights.stream("key", lambda: backend.stream("prompt"))
+    head = [next(first), next(first)]
+
+    second = flights.stream("key", lambda: backend.stream("prompt"))
+    assert "".join(second) == RESPONSE
+    assert "".join(head) + "".join(first) == RESPONSE
+    assert backend.calls == 1
+
+
+def test_upstream_closed_after_last_subscriber_leaves():
+    backend = slow_backend()
+    closed = threading.Event()
+
+    def producer():
+        try:
+            yield from backend.stream("prompt")
+        finally:
+            closed.set()
+
+    flights = SingleFlight()
+    first = flights.stream("key", producer)
+    second = flights.stream("key", producer)
+    next(first)
+    next(second)
+
+    first.close()
+    assert not closed.wait(0.1)  # 아직 구독자가 남아 있음
+    second.close()
+    assert closed.wait(TIMEOUT)
+    assert flights.in_flight() == 0
+    assert backend.calls == 1
+
+
+def test_new_request_after_cancel_starts_new_upstream():
+    backend = slow_backend()
+    flights = SingleFlight()
+    first = flights.stream("key", lambda: backend.stream("prompt"))
+    next(first)
+    first.close()
+
+    assert "".join(flights.stream("key", lambda: backend.stream("prompt"))) == (
+        RESPONSE
+    )
+    assert backend.calls == 2
+
+
+def test_error_reaches_every_subscriber():
+    started = threading.Event()
+    release = threading.Event()
+
+    def producer():
+        yield "부분"
+        started.set()
+        release.wait(TIMEOUT)
+        raise ConnectionError("끊김")
+
+    flights = SingleFlight()
+    first = flights.stream("key", producer)
+    assert next(first) == "부분"
+    assert started.wait(TIMEOUT)
+    second = flights.stream("key", producer)
+    release.set()
+
+    for subscriber in (first, second):
+        with pytest.raises(ConnectionError):
+            list(subscriber)
@@ -4,3 +4,29 @@ import os
 def get_api_key():
     """환경 변수에서 API 키를 가져옵니다."""
     return os.environ.get("GEMINI_API_KEY")
+
+
+def get_cache_dir():
+    """환경 변수에서 디스크 캐시 디렉터리를 가져옵니다. 없으면 디스크 캐시를 사용하지 않습니다."""
+    return os.environ.get("CACHE_DIR")
+
+
+def get_env_int(name, default):
+    """정수형 환경 변수를 읽습니다. 값이 없거나 잘못되면 기본값을 반환합니다."""
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_env_float(name, default):
+    """실수형 환경 변수를 읽습니다. 값이 없거나 잘못되면 기본값을 반환합니다."""
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_docx_template_path():
+    """환경 변수에서 학교 DOCX 서식 템플릿 경로를 가져옵니다. 없으면 기본 서식을 사용합니다."""
+    return os.environ.get("DOCX_TEMPLATE_PATH")
@@ -1,6 +1,34 @@
+import time
+import uuid
+
 import streamlit as st
 from streamlit_extras.colored_header import colored_header
 
+from utils import get_env_float, get_env_int
+
+# --- Stream Rendering Cadence ---
+STREAM_FLUSH_INTERVAL = get_env_float("STREAM_FLUSH_INTERVAL", 0.15)  # 초
+STREAM_FLUSH_BYTES = get_env_int("STREAM_FLUSH_BYTES", 2048)
+
+
+def _supports_deferred_download():
+    """download_button이 데이터 대신 함수를 받아 클릭할 때 읽을 수 있는지 확인합니다."""
+    try:
+        from streamlit.elements.widgets.button import DownloadButtonDataType
+    except ImportError:
+        return False
+    return "Callable" in str(DownloadButtonDataType)
+
+
+DEFERRED_DOWNLOAD = _supports_deferred_download()
+
+
+def get_session_id():
+    """현재 브라우저 세션의 식별자를 반환합니다 (생성 대기열의 세션 구분용)."""
+    if "session_id" not in st.session_state:
+        st.session_state["session_id"] = uuid.uuid4().hex
+    return st.session_state["session_id"]
+
 
 def display_header():
     """페이지 상단의 헤더를 표시합니다."""
@@ -57,15 +85,78 @@ def update_results_stream(placeholder, current_text):
     )  # Add cursor effect
 
 
+class StreamRenderer:
+    """스트리밍 청크를 모아 두었다가 일정 시간/분량마다 결과 영역을 다시 그립니다.
+
+    청크마다 전체 텍스트를 다시 그리지 않도록 `flush_interval`초가 지났거나
+    `flush_bytes` 이상이 쌓였을 때만 placeholder를 갱신합니다.
+    """
+
+    def __init__(
+        self,
+        placeholder,
+        flush_interval=STREAM_FLUSH_INTERVAL,
+        flush_bytes=STREAM_FLUSH_BYTES,
+    ):
+        self.placeholder = placeholder
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.render_count = 0
+        self.render_time = 0.0
+        self._chunks = []
+        self._pending_bytes = 0
+        self._last_flush = time.perf_counter()
+
+    @property
+    def text(self):
+        """지금까지 받은 전체 텍스트를 반환합니다."""
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def append(self, chunk):
+        """청크를 버퍼에 추가하고, 주기가 되었으면 결과 영역을 갱신합니다."""
+        self._chunks.append(chunk)
+        self._pending_bytes += len(chunk.encode("utf-8"))
+        if (
+            self.render_count == 0  # 첫 청크는 바로 보여줌
+            or self._pending_bytes >= self.flush_bytes
+            or time.perf_counter() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self):
+        """버퍼에 남은 내용을 결과 영역에 반영합니다."""
+        if not self._pending_bytes:
+            return
+        start = time.perf_counter()
+        update_results_stream(self.placeholder, self.text)
+        self._last_flush = time.perf_counter()
+        self.render_time += self._last_flush - start
+        self.render_count += 1
+        self._pending_bytes = 0
+
+
 def display_final_result(placeholder, html_content):
     """최종 결과를 HTML 형식으로 결과 영역에 표시합니다."""
     placeholder.markdown(html_content, unsafe_allow_html=True)
 
 
-def display_download_button(title, docx_data):
-    """DOCX 다운로드 버튼을 표시합니다. 기존 컨테이너의 내용을 유지합니다."""
+def display_download_area():
+    """다운로드 버튼을 나중에 채울 빈 영역(placeholder)을 만듭니다."""
+    return st.empty()
+
+
+def display_download_button(title, docx_data, placeholder=None):
+    """DOCX 다운로드 버튼을 표시합니다. 기존 컨테이너의 내용을 유지합니다.
+
+    `docx_data`가 함수이면 가능한 경우 버튼을 누를 때만 읽어, 다시 실행될 때마다
+    결과 전체를 복사해 두지 않습니다.
+    """
+    if callable(docx_data) and not DEFERRED_DOWNLOAD:
+        docx_data = docx_data()
     # 새 컨테이너를 생성하여 다운로드 버튼만 표시
-    download_container = st.container()
+    download_container = placeholder.container() if placeholder else st.container()
     with download_container:
         st.download_button(
             label="📄 DOCX로 다운로드",
@@ -77,6 +168,24 @@ def display_download_button(title, docx_data):
         )
 
 
+def display_section_editor(headings):
+    """부분 다시 쓰기 위젯을 표시하고 (부분 번호, 수정 요청, 클릭 여부)를 반환합니다."""
+    with st.expander("✏️ 부분 다시 쓰기"):
+        index = st.selectbox(
+            "다시 작성할 부분",
+            options=list(range(len(headings))),
+            format_func=lambda i: headings[i] or "(머리말)",
+            key="section_select",
+        )
+        section_instructions = st.text_input(
+            "수정 요청 (선택 사항)",
+            placeholder="예: 추진 일정을 월별 표로 바꿔주세요.",
+            key="section_instructions",
+        )
+        clicked = st.button("선택한 부분 다시 작성", key="regenerate_section_button")
+    return index, section_instructions, clicked
+
+
 def display_error(message):
     """에러 메시지를 표시합니다."""
     st.error(message)
@@ -117,9 +226,9 @@ def display_faq():
             * **특정 양식 요청:** (예:  표 형식으로 작성,  핵심 내용만 요약,  자유 형식으로 작성)
             * **분량:** (예:  A4 2장 내외로 요약)
             **Q5. 계획서/보고서 생성 후 수정은 어떻게 하나요?**
-            A. 계획서/보고서 생성 후, 하단 출력 내용을 확인하고, 필요한 경우 **텍스트를 선택하여 복사**한 후, 워드프로세서(MS Word, 한글 등)에 붙여넣어 수정할 수 있습니다.  향후 챗봇 기능을 추가하여 앱 내에서 직접 수정하고 추가적인 요청을 할 수 있도록 개선할 예정입니다.
+            A. 계획서/보고서 생성 후, 하단 출력 내용을 확인하고, 필요한 경우 **텍스트를 선택하여 복사**한 후, 워드프로세서(MS Word, 한글 등)에 붙여넣어 수정할 수 있습니다.  특정 부분만 고치고 싶다면 **✏️ 부분 다시 쓰기**에서 해당 부분을 골라 수정 요청을 입력하면, 그 부분만 다시 작성됩니다.  향후 챗봇 기능을 추가하여 앱 내에서 직접 수정하고 추가적인 요청을 할 수 있도록 개선할 예정입니다.
             **Q6.  PDF 파일 텍스트 추출 오류가 발생할 경우 어떻게 해야 하나요?**
-            A.  PDF 파일이 이미지 형태로 스캔된 경우, 텍스트 추출이 제대로 이루어지지 않을 수 있습니다.  가능하다면 **텍스트 기반 PDF 파일**을 사용하거나, OCR (광학 문자 인식) 기능을 활용하여 텍스트를 추출한 후 다시 시도해보세요.  향후 OCR 기능 내장 또는 PDF 텍스트 추출 성능 향상을 위해 지속적으로 개선할 예정입니다.
+            A.  PDF 파일이 이미지 형태로 스캔된 경우, 텍스트가 없는 페이지는 **OCR (광학 문자 인식)**로 자동 인식합니다.  스캔 페이지가 많으면 처리에 시간이 걸릴 수 있으며, 정해진 시간 안에 인식하지 못한 페이지는 제외됩니다 (같은 파일을 다시 올리면 이어서 처리합니다).  인식 결과가 좋지 않다면 **텍스트 기반 PDF 파일**을 사용하거나, 해상도가 높은 스캔본으로 다시 시도해보세요.
             **Q7.  지원하는 출력 형식은 무엇인가요?**
             A.  현재는 **Markdown 형식**으로 결과를 출력합니다.  
             * **DOCX 다운로드**버튼으로 Word 문서(.docx)로 다운받을 수 있습니다.